@@ -0,0 +1,198 @@
+"""
+Shared HTTP clients for the Hugging Face inference API.
+
+All model calls go through one pooled session per process, so TLS connections
+are kept alive and reused instead of being set up for every request. Calls have
+connect/read timeouts and are retried with backoff when the API answers 503
+while a model is loading (it reports an ``estimated_time`` in that case), on
+other transient statuses and on connection errors.
+
+InferenceClient is for regular views; AsyncInferenceClient is the aiohttp
+equivalent for async views. Both take their base URL from
+HF_INFERENCE_BASE_URL, which can point at a local stub server.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+def retry_delay(attempt, body, backoff, max_backoff):
+    """
+    Seconds to wait before the next attempt.
+
+    Uses the API's estimated_time for a loading model when present, otherwise
+    exponential backoff.
+
+    Args:
+    attempt (int): Number of the attempt that just failed, starting at 0
+    body (dict or None): Decoded JSON error body
+    backoff (float): Base delay in seconds
+    max_backoff (float): Upper bound for the delay
+
+    Returns:
+    float
+    """
+    if isinstance(body, dict) and body.get('estimated_time'):
+        return min(float(body['estimated_time']), max_backoff)
+    return min(backoff * (2 ** attempt), max_backoff)
+
+
+class InferenceClient:
+    """
+    Pooled, retrying client built on a shared requests.Session.
+    """
+
+    def __init__(self, headers, connect_timeout=5, read_timeout=120, max_retries=3,
+                 backoff=1.0, max_backoff=30, pool_size=10):
+        self.headers = headers
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.pool_size = pool_size
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update(self.headers)
+                self._session = session
+            return self._session
+
+    def post(self, url, payload, **kwargs):
+        """
+        POST JSON to a model endpoint, retrying transient failures.
+
+        Args:
+        url (str): Model endpoint
+        payload (dict): JSON body
+
+        Returns:
+        requests.Response: The last response received
+        """
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = self.session.post(url, json=payload, timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if last_attempt:
+                    raise
+                delay = retry_delay(attempt, None, self.backoff, self.max_backoff)
+                logger.warning(f"Request to {url} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            if response.status_code not in RETRY_STATUSES or last_attempt:
+                return response
+            try:
+                body = response.json()
+            except ValueError:
+                body = None
+            delay = retry_delay(attempt, body, self.backoff, self.max_backoff)
+            logger.warning(f"{url} returned {response.status_code}, retrying in {delay:.1f}s")
+            response.close()
+            time.sleep(delay)
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+class AsyncInferenceResponse:
+    """
+    Body and status of an aiohttp response, read before the connection is released.
+    """
+
+    def __init__(self, status_code, content, content_type):
+        self.status_code = status_code
+        self.content = content
+        self.content_type = content_type
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class AsyncInferenceClient:
+    """
+    aiohttp equivalent of InferenceClient for async views.
+
+    aiohttp sessions are bound to an event loop, so one pooled session is kept
+    per loop.
+    """
+
+    def __init__(self, headers, connect_timeout=5, read_timeout=120, max_retries=3,
+                 backoff=1.0, max_backoff=30, pool_size=10):
+        self.headers = headers
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.pool_size = pool_size
+        self._sessions = {}
+
+    def session(self):
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=aiohttp.ClientTimeout(sock_connect=self.connect_timeout, sock_read=self.read_timeout),
+            )
+            self._sessions[loop] = session
+        return session
+
+    async def post(self, url, payload):
+        """
+        POST JSON to a model endpoint, retrying transient failures.
+
+        Returns:
+        AsyncInferenceResponse: The last response received
+        """
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                async with self.session().post(url, json=payload) as response:
+                    result = AsyncInferenceResponse(response.status, await response.read(), response.content_type)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if last_attempt:
+                    raise
+                delay = retry_delay(attempt, None, self.backoff, self.max_backoff)
+                logger.warning(f"Request to {url} failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            if result.status_code not in RETRY_STATUSES or last_attempt:
+                return result
+            try:
+                body = result.json()
+            except ValueError:
+                body = None
+            delay = retry_delay(attempt, body, self.backoff, self.max_backoff)
+            logger.warning(f"{url} returned {result.status_code}, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def close(self):
+        loop = asyncio.get_running_loop()
+        session = self._sessions.pop(loop, None)
+        if session is not None:
+            await session.close()
@@ -0,0 +1,99 @@
+# imaging.py
+"""
+Format-aware encoding of generated images.
+
+The image model usually answers with a JPEG already. Decoding it and saving it
+as JPEG again costs CPU and loses quality, so the upstream bytes are sniffed
+and passed through unchanged when their format is in
+IMAGE_PASSTHROUGH_FORMATS. Anything else is transcoded once to
+IMAGE_OUTPUT_FORMAT (JPEG, WEBP or AVIF) at IMAGE_OUTPUT_QUALITY.
+"""
+import io
+import logging
+from collections import namedtuple
+
+from django.conf import settings
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Pillow format name -> (content type, file extension)
+FORMATS = {
+    'JPEG': ('image/jpeg', '.jpg'),
+    'PNG': ('image/png', '.png'),
+    'WEBP': ('image/webp', '.webp'),
+    'AVIF': ('image/avif', '.avif'),
+}
+
+EncodedImage = namedtuple('EncodedImage', ['content', 'format', 'content_type', 'extension'])
+
+
+def sniff_format(data):
+    """
+    Detect the image format from its magic bytes.
+
+    Returns:
+    str: Pillow format name, or None if unknown
+    """
+    if data[:3] == b'\xff\xd8\xff':
+        return 'JPEG'
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'PNG'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'WEBP'
+    if data[4:8] == b'ftyp' and data[8:12] in (b'avif', b'avis'):
+        return 'AVIF'
+    return None
+
+
+def can_save(image_format):
+    """
+    Whether the installed Pillow can write the format (AVIF needs a plugin).
+    """
+    Image.init()
+    return image_format in Image.SAVE
+
+
+def encoded(content, image_format):
+    content_type, extension = FORMATS[image_format]
+    return EncodedImage(content, image_format, content_type, extension)
+
+
+def transcode(image, image_format, quality):
+    """
+    Save a PIL image in the given format.
+
+    Returns:
+    EncodedImage
+    """
+    if not can_save(image_format):
+        logger.warning(f"Pillow cannot write {image_format}, using JPEG")
+        image_format = 'JPEG'
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, quality=quality)
+    return encoded(buffer.getvalue(), image_format)
+
+
+def encode_image(data, image_format=None, quality=None, passthrough=None):
+    """
+    Return upstream image bytes ready to store, re-encoding only when needed.
+
+    Args:
+    data (bytes): Image as returned by the model
+    image_format (str): Target format, defaults to IMAGE_OUTPUT_FORMAT
+    quality (int): Encoder quality, defaults to IMAGE_OUTPUT_QUALITY
+    passthrough (list): Formats stored unchanged, defaults to IMAGE_PASSTHROUGH_FORMATS
+
+    Returns:
+    EncodedImage
+    """
+    image_format = (image_format or settings.IMAGE_OUTPUT_FORMAT).upper()
+    quality = quality or settings.IMAGE_OUTPUT_QUALITY
+    passthrough = settings.IMAGE_PASSTHROUGH_FORMATS if passthrough is None else passthrough
+
+    upstream_format = sniff_format(data)
+    if upstream_format and upstream_format in passthrough:
+        return encoded(data, upstream_format)
+    return transcode(Image.open(io.BytesIO(data)), image_format, quality)
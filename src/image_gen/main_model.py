@@ -1,6 +1,8 @@
-import requests
 import os
 import json
+from django.conf import settings
+from .http_client import AsyncInferenceClient, InferenceClient
+from .response_cache import MISSING, ResponseCache
 
 file_path = os.path.join('src', 'secrets', 'secrets.txt')
 
@@ -16,10 +18,44 @@ headers = {
     "Authorization": f"Bearer {access_token}"
 }
 
+client_options = {
+    "connect_timeout": settings.HF_HTTP_CONNECT_TIMEOUT,
+    "read_timeout": settings.HF_HTTP_READ_TIMEOUT,
+    "max_retries": settings.HF_HTTP_MAX_RETRIES,
+    "backoff": settings.HF_HTTP_BACKOFF,
+    "max_backoff": settings.HF_HTTP_MAX_BACKOFF,
+    "pool_size": settings.HF_HTTP_POOL_SIZE,
+}
+# Shared keep-alive clients, see http_client.py
+client = InferenceClient(headers, **client_options)
+async_client = AsyncInferenceClient(headers, **client_options)
+
+# Text and summary responses for identical payloads, see response_cache.py
+response_cache = ResponseCache(
+    max_entries=settings.HF_RESPONSE_CACHE_MAX_ENTRIES,
+    ttl=settings.HF_RESPONSE_CACHE_TTL,
+    backend=settings.HF_RESPONSE_CACHE_BACKEND,
+)
+
+def cached_json_query(url, payload):
+	if settings.HF_RESPONSE_CACHE_ENABLED:
+		cached = response_cache.get(url, payload)
+		if cached is not MISSING:
+			return cached
+	response = client.post(url, payload)
+	result = response.json()
+	if settings.HF_RESPONSE_CACHE_ENABLED and response.status_code == 200:
+		response_cache.set(url, payload, result)
+	return result
+
 #IMAGE GENERATION
-imageAPI_URL = "https://api-inference.huggingface.co/models/black-forest-labs/FLUX.1-dev"
+imageAPI_URL = f"{settings.HF_INFERENCE_BASE_URL}/models/black-forest-labs/FLUX.1-dev"
 def IMAGE_query(payload):
-	response = requests.post(imageAPI_URL, headers=headers, json=payload)
+	response = client.post(imageAPI_URL, payload)
+	return response.content
+
+async def IMAGE_query_async(payload):
+	response = await async_client.post(imageAPI_URL, payload)
 	return response.content
 
 """
@@ -37,12 +73,47 @@ print(image)
 """
 
 #Text Generation
-TextAPI_URL = "https://api-inference.huggingface.co/models/mistralai/Mistral-Nemo-Instruct-2407"
+TextAPI_URL = f"{settings.HF_INFERENCE_BASE_URL}/models/mistralai/Mistral-Nemo-Instruct-2407"
 
 def Text_query(payload):
     
-	response = requests.post(TextAPI_URL, headers=headers, json=payload)
+	return cached_json_query(TextAPI_URL, payload)
+
+async def Text_query_async(payload):
+	response = await async_client.post(TextAPI_URL, payload)
 	return response.json()
+
+def Text_query_stream(payload):
+	"""
+	Yield generated tokens as the API streams them (server-sent events).
+	Special tokens such as end-of-sequence are skipped. A cached answer is
+	yielded as a single token.
+	"""
+	payload = {**payload, "stream": True}
+	if settings.HF_RESPONSE_CACHE_ENABLED:
+		cached = response_cache.get(TextAPI_URL, payload)
+		if cached is not MISSING:
+			yield cached
+			return
+	tokens = []
+	response = client.post(TextAPI_URL, payload, stream=True)
+	try:
+		if response.status_code != 200:
+			raise Exception(f"Text generation failed: HTTP {response.status_code} {response.text[:200]}")
+		for line in response.iter_lines(decode_unicode=True):
+			if not line or not line.startswith("data:"):
+				continue
+			event = json.loads(line[len("data:"):])
+			if "error" in event:
+				raise Exception(f"Text generation failed: {event['error']}")
+			token = event.get("token") or {}
+			if token.get("text") and not token.get("special"):
+				tokens.append(token["text"])
+				yield token["text"]
+	finally:
+		response.close()
+	if settings.HF_RESPONSE_CACHE_ENABLED:
+		response_cache.set(TextAPI_URL, payload, "".join(tokens))
 """	
 output = Text_query({
     "inputs": "Please provide a detailed description of china town in kenya",
@@ -63,10 +134,13 @@ print(output)
 
 #Summarization
 
-SummaryAPI_URL = "https://api-inference.huggingface.co/models/facebook/bart-large-cnn"
+SummaryAPI_URL = f"{settings.HF_INFERENCE_BASE_URL}/models/facebook/bart-large-cnn"
 
 def SUMMARY_query(payload):
-	response = requests.post(SummaryAPI_URL, headers=headers, json=payload)
+	return cached_json_query(SummaryAPI_URL, payload)
+
+async def SUMMARY_query_async(payload):
+	response = await async_client.post(SummaryAPI_URL, payload)
 	return response.json()
 """	
 output = SUMMARY_query({
@@ -0,0 +1,112 @@
+"""
+Cache of inference API responses keyed on (model URL, payload).
+
+Identical prompts with identical parameters are answered from memory instead of
+calling the remote model again. The first tier is an in-process LRU with a TTL
+and a maximum number of entries. An optional second tier is any configured
+Django cache (HF_RESPONSE_CACHE_BACKEND, e.g. the file-based 'hf_responses'
+cache), which is shared between workers and survives restarts.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+
+MISSING = object()
+
+
+class ResponseCache:
+    """
+    Two-tier response cache with hit/miss counters.
+    """
+
+    def __init__(self, max_entries=1000, ttl=3600, backend=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.backend = backend
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.backend_hits = 0
+
+    @staticmethod
+    def make_key(url, payload):
+        """
+        Returns:
+        str: Hash of the model URL and the canonical JSON of the payload
+        """
+        raw = json.dumps([url, payload], sort_keys=True, ensure_ascii=False)
+        return 'hf-response:' + hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, url, payload):
+        """
+        Look up a response.
+
+        Returns:
+        The cached value, or MISSING
+        """
+        key = self.make_key(url, payload)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        if self.backend:
+            value = caches[self.backend].get(key, MISSING)
+            if value is not MISSING:
+                with self._lock:
+                    self.hits += 1
+                    self.backend_hits += 1
+                    self._store(key, value)
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return MISSING
+
+    def set(self, url, payload, value):
+        """
+        Store a response in both tiers.
+        """
+        key = self.make_key(url, payload)
+        with self._lock:
+            self._store(key, value)
+        if self.backend:
+            caches[self.backend].set(key, value, timeout=self.ttl)
+
+    def _store(self, key, value):
+        # Caller must hold self._lock.
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        """
+        Returns:
+        dict: Hit/miss counters and the number of in-process entries
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "backend_hits": self.backend_hits,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.backend_hits = 0
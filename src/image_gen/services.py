@@ -0,0 +1,117 @@
+# services.py
+"""
+In-process API of the Hugging Face text, summary and image models.
+
+Pipeline stages call these functions directly and get plain Python values
+back (str for text, encoded image bytes for images). Base64 and JSON encoding only happen in
+the HTTP views, which wrap these functions.
+"""
+import logging
+import re
+
+from .imaging import encode_image
+from .main_model import IMAGE_query, SUMMARY_query, Text_query
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceError(Exception):
+    """The model returned something other than the expected result."""
+
+
+def clean_text(text):
+    """
+    Cleans the generated text by removing unwanted characters, excessive newlines, and spaces.
+    You can customize this function as per your specific cleaning requirements.
+    """
+    # Remove unwanted characters (example: non-alphanumeric except basic punctuation)
+    text = re.sub(r'[^\w\s\'".,!?-]+', '', text)  # Keep alphanumeric, whitespace, and basic punctuation
+
+    # Remove excessive whitespace (more than 1 space)
+    text = re.sub(r'\s{2,}', ' ', text)
+
+    # Trim excessive newlines (more than 2 newlines)
+    text = re.sub(r'\n{3,}', '\n\n', text)
+
+    # Strip leading and trailing spaces
+    return text.strip()
+
+
+def text_prompt(text, context=''):
+    prompt = f"Please provide a detailed description of, {text}"
+    if context:
+        return f"Conversation so far:\n{context}\n\n{prompt}"
+    return prompt
+
+
+def generate_text(text, context=''):
+    """
+    Generate a cleaned answer for the user's input.
+
+    Args:
+    text (str): User input
+    context (str): Earlier conversation, see text/context.py
+
+    Returns:
+    str: The cleaned answer
+
+    Raises:
+    ServiceError: If the model response has an unexpected format
+    """
+    input_text_with_prompt = text_prompt(text, context)
+    response = Text_query({
+        "inputs": input_text_with_prompt,
+    })
+
+    logger.debug(f"Text_query response: {response}")
+    if not isinstance(response, list) or not response or 'generated_text' not in response[0]:
+        logger.error(f"Unexpected response format from Text_query: {response}")
+        raise ServiceError("Unexpected response format from text generation model")
+
+    generated_text = response[0]['generated_text']
+
+    # Clean the generated text
+    if generated_text.startswith(input_text_with_prompt):
+        generated_text = generated_text[len(input_text_with_prompt):].strip()
+
+    return clean_text(generated_text)
+
+
+def generate_summary(text):
+    """
+    Summarise text.
+
+    Returns:
+    str: The summary
+
+    Raises:
+    ServiceError: If the model response has an unexpected format
+    """
+    response = SUMMARY_query({
+        "inputs": text,
+    })
+    if isinstance(response, list) and response and 'summary_text' in response[0]:
+        return response[0]['summary_text']
+    logger.error(f"Unexpected response format from SUMMARY_query: {response}")
+    raise ServiceError("Unexpected response format from summary model")
+
+
+def generate_image(text):
+    """
+    Generate an image that illustrates text.
+
+    The model's bytes are stored as they are when already in an accepted
+    format, otherwise transcoded once (see imaging.py).
+
+    Args:
+    text (str): Text to illustrate
+
+    Returns:
+    imaging.EncodedImage
+    """
+    text = f"Please generate an image that best describes: {text}"
+    image_bytes = IMAGE_query({
+        "inputs": text,
+    })
+
+    return encode_image(image_bytes)
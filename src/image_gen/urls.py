@@ -8,4 +8,6 @@ urlpatterns = [
    # path('generate-image/', views.generate_image, name='text_to_speech'), #input is json { "text":""} output .JpegImageFile image mode=RGB size=1024x1024 {image.show()}
     
    # path('generate-summary/', views.generate_summary, name='text_to_speech'), #input is json { "text":""}  output {"summary_text":""}	string	The summarized text.
+
+    path('cache-stats/', views.response_cache_stats, name='response_cache_stats'),
 ]
\ No newline at end of file
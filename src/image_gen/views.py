@@ -1,7 +1,9 @@
 from django.shortcuts import render
 
 # Create your views here.
-from .main_model import Text_query, IMAGE_query, SUMMARY_query # diffrent models.
+from .main_model import Text_query, Text_query_stream, IMAGE_query, SUMMARY_query, response_cache # diffrent models.
+from . import services
+from .services import ServiceError, clean_text, text_prompt
 from django.http import  JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
@@ -18,22 +20,61 @@ import re
 
 logger = logging.getLogger(__name__)
 
-def clean_text(text):
+class StreamingTextCleaner:
     """
-    Cleans the generated text by removing unwanted characters, excessive newlines, and spaces.
-    You can customize this function as per your specific cleaning requirements.
-    """
-    # Remove unwanted characters (example: non-alphanumeric except basic punctuation)
-    text = re.sub(r'[^\w\s\'".,!?-]+', '', text)  # Keep alphanumeric, whitespace, and basic punctuation
+    Applies clean_text to text that arrives in pieces.
     
-    # Remove excessive whitespace (more than 1 space)
-    text = re.sub(r'\s{2,}', ' ', text)
+    feed() returns the part of the cleaned text that is final so far. A run of
+    whitespace is held back until the next visible character shows whether it
+    is trailing and how long it is. The concatenated output of feed() calls
+    equals clean_text() of the concatenated input.
+    """
+    unwanted = re.compile(r'[^\w\s\'".,!?-]+')
+
+    def __init__(self):
+        self.pending_space = ''
+        self.started = False
+        self.text = ''
+
+    def feed(self, piece):
+        out = []
+        for char in self.unwanted.sub('', piece):
+            if char.isspace():
+                self.pending_space += char
+                continue
+            if self.pending_space and self.started:
+                # Same rule as clean_text: a run of 2+ whitespace becomes one space
+                out.append(self.pending_space if len(self.pending_space) == 1 else ' ')
+            self.pending_space = ''
+            self.started = True
+            out.append(char)
+        cleaned = ''.join(out)
+        self.text += cleaned
+        return cleaned
+
+
+def generate_text_stream(text, context=''):
+    """
+    Stream the answer for text, cleaned incrementally.
     
-    # Trim excessive newlines (more than 2 newlines)
-    text = re.sub(r'\n{3,}', '\n\n', text)
+    Args:
+    text (str): User input
+    context (str): Earlier conversation, see text/context.py
     
-    # Strip leading and trailing spaces
-    return text.strip()
+    Returns:
+    tuple: (generator of cleaned text pieces, StreamingTextCleaner whose .text
+        holds the full cleaned answer once the generator is exhausted)
+    """
+    cleaner = StreamingTextCleaner()
+
+    def pieces():
+        for token in Text_query_stream({"inputs": text_prompt(text, context)}):
+            cleaned = cleaner.feed(token)
+            if cleaned:
+                yield cleaned
+
+    return pieces(), cleaner
+
 
 def generate_text(request):
     try:
@@ -44,30 +85,14 @@ def generate_text(request):
         text = data.get('text')
         if not text:
             return JsonResponse({"error": "No text provided"}, status=400)
-        input_text_with_prompt = f"Please provide a detailed description of, {text}"
-        response = Text_query({
-            "inputs": input_text_with_prompt,
-        })
-        
-        logger.debug(f"Text_query response: {response}")
-        if not isinstance(response, list) or not response or 'generated_text' not in response[0]:
-            logger.error(f"Unexpected response format from Text_query: {response}")
-            return JsonResponse({"error": "Unexpected response format from text generation model"}, status=500)
-
-        generated_text = response[0]['generated_text']
-        
-        # Clean the generated text
-        if generated_text.startswith(input_text_with_prompt):
-            generated_text = generated_text[len(input_text_with_prompt):].strip()
-
-        cleaned_text = clean_text(generated_text)
 
-        return JsonResponse({"generated_text": cleaned_text})
-    #JsonResponse({"generated_text": generated_text.strip()})
+        return JsonResponse({"generated_text": services.generate_text(text)})
 
     except json.JSONDecodeError:
         logger.error("Invalid JSON in request body", exc_info=True)
         return JsonResponse({"error": "Invalid JSON in request body"}, status=400)
+    except ServiceError as e:
+        return JsonResponse({"error": str(e)}, status=500)
     except Exception as e:
         logger.error(f"Error in generate_text view: {str(e)}", exc_info=True)
         return JsonResponse({"error": "An unexpected error occurred"}, status=500)
@@ -119,20 +144,11 @@ def generate_image(request):
         if not text:
             return JsonResponse({"error": "No text provided"}, status=400)
 
-        text = f"Please generate an image that best describes: {text}"
-        image_bytes = IMAGE_query({
-            "inputs": text,
-        })
+        image = services.generate_image(text)
 
-        generated_image = Image.open(io.BytesIO(image_bytes))
+        image_base64 = base64.b64encode(image.content).decode('utf-8')
 
-        buffer = io.BytesIO()
-        generated_image.save(buffer, format="JPEG")
-        buffer.seek(0)
-
-        image_base64 = base64.b64encode(buffer.read()).decode('utf-8')
-
-        return JsonResponse({"image_base64": image_base64})
+        return JsonResponse({"image_base64": image_base64, "content_type": image.content_type})
 
     except json.JSONDecodeError:
         return JsonResponse({"error": "Invalid JSON in request body"}, status=400)
@@ -154,11 +170,7 @@ def generate_summary(request):
         
         if not text:
             return JsonResponse({"error": "No text provided"}, status=400)
-        summary = SUMMARY_query(
-            {
-            "inputs": text,
-        }
-        )
+        summary = services.generate_summary(text)
         return  JsonResponse({
             
             'summary_text' : summary }) #  {"summary_text":""}	string	The summarized text.
@@ -167,5 +179,10 @@ def generate_summary(request):
         return JsonResponse({"error": "Invalid JSON in request body"}, status=400)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
-    
-    
\ No newline at end of file
+
+
+def response_cache_stats(request):
+    """
+    Hit/miss counters of the text and summary response cache in this worker.
+    """
+    return JsonResponse(response_cache.stats())
@@ -0,0 +1,339 @@
+"""
+Content-addressed cache of synthesised speech.
+
+Rendered WAV files are stored under MEDIA_ROOT/<TTS_CACHE_DIR>/ and named after
+a hash of everything that affects the audio (normalised text, model, speaker,
+speed and language), so identical utterances are synthesised once and every
+File.output_audio row that needs them can point at the same blob. Encoded
+copies for storage (AUDIO_STORAGE_CODEC) are cached next to the WAV, keyed by
+codec and bitrate as well.
+
+The directory is bounded by TTS_CACHE_MAX_MB across all worker processes:
+after every write the blobs on disk are scanned under a file lock and the least
+recently used ones are removed (hits touch the blob's mtime). Blobs still
+referenced by File rows stay on disk until release() sees their last row gone,
+and blobs used within TTS_CACHE_GRACE_SECONDS are kept so a request that just
+got a hit has time to save the row pointing at it. When the last row using an
+utterance is deleted, release() removes its blobs; purge_orphaned_media picks
+up the ones still in their grace period then.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.conf import settings
+
+from .audio_codec import CODECS, encode_audio
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text):
+    """
+    Normalise text so trivially different inputs share a cache entry.
+
+    Args:
+    text (str): Text to synthesise
+
+    Returns:
+    str: NFC-normalised text with whitespace collapsed
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(text, model_name, speaker=None, speed=1.0, language=None):
+    """
+    Hash everything that changes the rendered audio.
+
+    Returns:
+    str: Hex sha256 digest
+    """
+    payload = json.dumps(
+        [normalize_text(text), model_name, speaker, float(speed), language],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TTSAudioCache:
+    """
+    Size-bounded LRU cache of WAV blobs stored under MEDIA_ROOT.
+    """
+
+    suffix = ".wav"
+    lock_name = ".lock"
+
+    def __init__(self, directory, max_bytes, grace_seconds=0):
+        self.directory = directory.strip("/")
+        self.max_bytes = max_bytes
+        self.grace_seconds = grace_seconds
+        self._lock = threading.Lock()
+
+    @property
+    def root(self):
+        return os.path.join(settings.MEDIA_ROOT, self.directory)
+
+    def name_for(self, key, extension=None):
+        """
+        Storage name (relative to MEDIA_ROOT) of a cache blob, usable as a FileField value.
+        """
+        return f"{self.directory}/{key[:2]}/{key}{extension or self.suffix}"
+
+    def path_for(self, key, extension=None):
+        return os.path.join(settings.MEDIA_ROOT, self.name_for(key, extension))
+
+    def key_of(self, name):
+        """
+        cache_key() of the utterance a cache blob (WAV or encoded copy) holds.
+        """
+        return os.path.basename(name).split(".")[0].split("_")[0]
+
+    def is_cache_name(self, name):
+        """
+        Whether a FileField name points at a shared cache blob.
+        """
+        return bool(name) and name.startswith(self.directory + "/")
+
+    @contextmanager
+    def _locked(self):
+        """
+        Hold the cache lock, shared by every process using the same MEDIA_ROOT.
+        """
+        with self._lock:
+            try:
+                import fcntl
+            except ImportError:
+                # Windows: no flock, only threads of this process are serialised
+                yield
+                return
+            os.makedirs(self.root, exist_ok=True)
+            with open(os.path.join(self.root, self.lock_name), "w") as handle:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _scan(self):
+        """
+        Blobs on disk, least recently used first.
+
+        Returns:
+        list: (mtime, storage name, size) tuples
+        """
+        found = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename == self.lock_name or filename.endswith(".tmp"):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                name = os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, "/")
+                found.append((stat.st_mtime, name, stat.st_size))
+        return sorted(found)
+
+    def get(self, key):
+        """
+        Look up a rendered utterance.
+
+        Args:
+        key (str): Result of cache_key()
+
+        Returns:
+        tuple: (wav bytes, storage name) or None on a miss
+        """
+        path = self.path_for(key)
+        try:
+            with open(path, "rb") as cached:
+                data = cached.read()
+        except FileNotFoundError:
+            return None
+        # The mtime orders eviction and starts the grace period of the hit
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data, self.name_for(key)
+
+    def put(self, key, data, extension=None):
+        """
+        Store a rendered utterance and evict old entries over the size bound.
+
+        Args:
+        key (str): Result of cache_key()
+        data (bytes): WAV bytes, or audio encoded for the given extension
+
+        Returns:
+        str: Storage name of the blob
+        """
+        path = self.path_for(key, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so concurrent readers never see a partial file.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+
+        self.evict()
+        return self.name_for(key, extension)
+
+    def encoded(self, name, wav_bytes, codec=None, bitrate=None):
+        """
+        The cached WAV blob at name encoded for storage, encoded once per codec
+        and bitrate so every File row playing the utterance shares one file.
+
+        Args:
+        name (str): Storage name of the WAV blob, as returned by put()
+        wav_bytes (bytes): Its contents
+        codec (str): Key of audio_codec.CODECS, defaults to AUDIO_STORAGE_CODEC
+        bitrate (str): ffmpeg bitrate, defaults to AUDIO_STORAGE_BITRATE
+
+        Returns:
+        str: Storage name of the encoded blob
+
+        Raises:
+        RuntimeError: If ffmpeg fails
+        """
+        codec = codec or settings.AUDIO_STORAGE_CODEC
+        bitrate = bitrate or settings.AUDIO_STORAGE_BITRATE
+        if codec == "wav":
+            return name
+        # Named after the WAV's key, so release() finds every copy of an utterance
+        key = f"{self.key_of(name)}_{codec}_{bitrate}"
+        extension = CODECS[codec][1]
+        path = self.path_for(key, extension)
+        if os.path.exists(path):
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            return self.name_for(key, extension)
+        audio = encode_audio(wav_bytes, codec, bitrate)
+        return self.put(key, audio.content, audio.extension)
+
+    def evict(self):
+        """
+        Remove the least recently used blobs until the directory fits in
+        max_bytes. Blobs used within grace_seconds are kept, their request may
+        not have saved its File row yet, and so are blobs File rows reference.
+
+        Returns:
+        int: Number of blobs removed
+        """
+        removed = 0
+        with self._locked():
+            found = self._scan()
+            total = sum(size for _, _, size in found)
+            if total <= self.max_bytes:
+                return 0
+            cutoff = time.time() - self.grace_seconds
+            candidates = [(name, size) for mtime, name, size in found if mtime <= cutoff]
+            referenced = self._referenced([name for name, _ in candidates])
+            for name, size in candidates:
+                if total <= self.max_bytes:
+                    break
+                if name in referenced:
+                    continue
+                self._remove(name)
+                total -= size
+                removed += 1
+        if removed:
+            logger.info(f"Evicted {removed} TTS cache blobs")
+        return removed
+
+    def _referenced(self, names):
+        File = apps.get_model("text", "File")
+        referenced = set()
+        for offset in range(0, len(names), 500):
+            referenced.update(
+                File.objects.filter(output_audio__in=names[offset:offset + 500])
+                .values_list("output_audio", flat=True)
+            )
+        return referenced
+
+    def _remove(self, name):
+        try:
+            os.remove(os.path.join(settings.MEDIA_ROOT, name))
+        except FileNotFoundError:
+            pass
+
+    def _group(self, key):
+        """
+        Storage names of the WAV and encoded copies of one utterance.
+        """
+        try:
+            filenames = os.listdir(os.path.join(self.root, key[:2]))
+        except FileNotFoundError:
+            return []
+        return [
+            f"{self.directory}/{key[:2]}/{filename}" for filename in filenames
+            if filename.startswith(key) and not filename.endswith(".tmp")
+        ]
+
+    def _used_since(self, names, cutoff):
+        for name in names:
+            try:
+                if os.stat(os.path.join(settings.MEDIA_ROOT, name)).st_mtime > cutoff:
+                    return True
+            except FileNotFoundError:
+                pass
+        return False
+
+    def release(self, name):
+        """
+        Called after a File row pointing at a cache blob is deleted. Once no
+        row uses the utterance any more, its WAV and encoded copies are
+        removed, so deleted speech stops being served. Utterances used within
+        grace_seconds are left to purge_orphaned_media, a request may be about
+        to save a row pointing at them.
+
+        Args:
+        name (str): Storage name of the blob
+        """
+        if not self.is_cache_name(name):
+            return
+        with self._locked():
+            group = self._group(self.key_of(name))
+            if not group or self._referenced(group):
+                return
+            if self._used_since(group, time.time() - self.grace_seconds):
+                return
+            for blob in group:
+                self._remove(blob)
+
+    def unreferenced(self, min_age=0):
+        """
+        Blobs of utterances no File row uses and nothing has read or written
+        for min_age seconds (at least grace_seconds).
+
+        Yields:
+        tuple: (storage name, size in bytes)
+        """
+        found = self._scan()
+        referenced = self._referenced([name for _, name, _ in found])
+        groups = {}
+        for mtime, name, size in found:
+            groups.setdefault(self.key_of(name), []).append((mtime, name, size))
+        cutoff = time.time() - max(min_age, self.grace_seconds)
+        for blobs in groups.values():
+            if any(name in referenced or mtime > cutoff for mtime, name, _ in blobs):
+                continue
+            for _, name, size in blobs:
+                yield name, size
+
+
+tts_cache = TTSAudioCache(
+    settings.TTS_CACHE_DIR,
+    settings.TTS_CACHE_MAX_MB * 1024 * 1024,
+    grace_seconds=settings.TTS_CACHE_GRACE_SECONDS,
+)
@@ -0,0 +1,89 @@
+# audio_codec.py
+"""
+Compressed storage of generated speech.
+
+TTS renders WAV, which is about 10x larger than speech-quality Opus or MP3.
+Before a File.output_audio is stored, the WAV is encoded with ffmpeg to
+AUDIO_STORAGE_CODEC ('opus' in an OGG container, 'mp3', or 'wav' to keep it
+as it is) at AUDIO_STORAGE_BITRATE. Clients that can only play WAV use the
+files/<id>/audio.wav endpoint, which decodes the stored file on the fly.
+"""
+import mimetypes
+import os
+import subprocess
+from collections import namedtuple
+
+from django.conf import settings
+
+# codec -> (ffmpeg encoder arguments, file extension, content type)
+CODECS = {
+    'wav': (None, '.wav', 'audio/wav'),
+    'opus': (['-c:a', 'libopus', '-application', 'voip', '-f', 'ogg'], '.ogg', 'audio/ogg'),
+    'mp3': (['-c:a', 'libmp3lame', '-f', 'mp3'], '.mp3', 'audio/mpeg'),
+}
+
+EncodedAudio = namedtuple('EncodedAudio', ['content', 'extension', 'content_type'])
+
+
+def run_ffmpeg(args, data):
+    """
+    Pipe data through ffmpeg.
+
+    Returns:
+    bytes: ffmpeg's output
+
+    Raises:
+    RuntimeError: If ffmpeg fails
+    """
+    cmd = ['ffmpeg', '-nostdin', '-loglevel', 'error', '-i', 'pipe:0'] + args + ['-']
+    try:
+        result = subprocess.run(cmd, input=data, capture_output=True)
+    except OSError as e:
+        raise RuntimeError(f"ffmpeg could not be started: {str(e)}") from e
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.decode(errors='ignore').strip()[-500:]}")
+    return result.stdout
+
+
+def encode_audio(wav_bytes, codec=None, bitrate=None):
+    """
+    Encode WAV bytes for storage.
+
+    Args:
+    wav_bytes (bytes): WAV file contents
+    codec (str): Key of CODECS, defaults to AUDIO_STORAGE_CODEC
+    bitrate (str): ffmpeg bitrate such as '32k', defaults to AUDIO_STORAGE_BITRATE
+
+    Returns:
+    EncodedAudio
+    """
+    codec = codec or settings.AUDIO_STORAGE_CODEC
+    if codec not in CODECS:
+        raise ValueError(f"Unknown audio codec: {codec}")
+    args, extension, content_type = CODECS[codec]
+    if args is None:
+        return EncodedAudio(wav_bytes, extension, content_type)
+    args = args + ['-b:a', bitrate or settings.AUDIO_STORAGE_BITRATE]
+    return EncodedAudio(run_ffmpeg(args, wav_bytes), extension, content_type)
+
+
+def decode_to_wav(data):
+    """
+    Decode stored audio of any format back to 16-bit PCM WAV bytes.
+    """
+    return run_ffmpeg(['-c:a', 'pcm_s16le', '-f', 'wav'], data)
+
+
+def is_wav(name):
+    return os.path.splitext(name)[1].lower() == '.wav'
+
+
+def content_type_for(name):
+    """
+    Content type of a stored audio file, from its extension.
+    """
+    extension = os.path.splitext(name)[1].lower()
+    for _, codec_extension, content_type in CODECS.values():
+        if extension == codec_extension:
+            return content_type
+    return mimetypes.guess_type(name)[0] or 'application/octet-stream'
@@ -0,0 +1,79 @@
+"""
+Compare time-to-first-byte of the buffered and streaming TTS endpoints.
+
+    python manage.py benchmark_tts_latency --repeat 3
+"""
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+
+from speech.tts_models import get_tts
+from speech.views import text_to_speech_api, text_to_speech_stream_api
+
+WAV_HEADER_SIZE = 44
+
+SAMPLE_TEXT = (
+    "Nairobi is the capital and largest city of Kenya. "
+    "It grew around a railway depot built at the start of the twentieth century. "
+    "Today the city is a regional hub for finance, technology and transport. "
+    "Nairobi National Park lies just south of the city centre, where giraffes and rhinos "
+    "can be seen against a backdrop of office towers. "
+    "The city hosts the United Nations Environment Programme and many international organisations."
+)
+
+
+class Command(BaseCommand):
+    help = "Measure time-to-first-byte and total time for buffered vs streaming text-to-speech."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help="Runs per mode")
+        parser.add_argument('--text', default=SAMPLE_TEXT, help="Text to synthesise")
+        parser.add_argument('--model', default=None, help="Coqui model name")
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        body = {"text": options['text']}
+        if options['model']:
+            body["model"] = options['model']
+
+        # Load the model up front so neither mode pays for it.
+        get_tts(options['model'])
+
+        modes = {
+            "buffered": text_to_speech_api,
+            "streaming": text_to_speech_stream_api,
+        }
+        with override_settings(TTS_CACHE_ENABLED=False):
+            for mode, view in modes.items():
+                first_bytes, totals = [], []
+                for _ in range(options['repeat']):
+                    request = factory.post('/api/speech/tts/', data=json.dumps(body), content_type='application/json')
+                    first_byte, total = self.measure(view, request)
+                    first_bytes.append(first_byte)
+                    totals.append(total)
+                self.stdout.write(
+                    f"{mode:<10} ttfb median {statistics.median(first_bytes):7.3f}s "
+                    f"total median {statistics.median(totals):7.3f}s ({options['repeat']} runs)"
+                )
+
+    def measure(self, view, request):
+        """
+        Time a request from the call into the view.
+
+        Returns:
+        tuple: (seconds to the first audio byte after the WAV header, seconds to the last byte)
+        """
+        started = time.perf_counter()
+        response = view(request)
+        if response.status_code != 200:
+            raise RuntimeError(response.content.decode('utf-8'))
+        first_byte = None
+        received = 0
+        for chunk in response.streaming_content:
+            received += len(chunk)
+            if first_byte is None and received > WAV_HEADER_SIZE:
+                first_byte = time.perf_counter() - started
+        return first_byte, time.perf_counter() - started
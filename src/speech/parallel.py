@@ -0,0 +1,96 @@
+"""
+Parallel synthesis of long texts across a pool of worker processes.
+
+A single TTS call runs on one core, so long answers are split into groups of
+sentences that are rendered concurrently, each worker with its own loaded
+model. The float samples are concatenated in memory and encoded to WAV once,
+so no segment goes through an intermediate file or lossy step.
+"""
+import logging
+
+import numpy as np
+from django.conf import settings
+
+from src.process_pool import SpawnPool
+from .streaming import normalize_peak, split_sentences, to_pcm16, wav_header
+
+logger = logging.getLogger(__name__)
+
+pool = SpawnPool('TTS_PARALLEL_WORKERS', 'TTS_PARALLEL_THREADS_PER_WORKER')
+
+
+def _render_segment(text, model_name, speaker, speed, language):
+    from .tts_models import is_multi_lingual, use_tts
+
+    tts_kwargs = {"text": text, "speaker": speaker, "speed": speed}
+    if is_multi_lingual(model_name):
+        tts_kwargs["language"] = language
+    with use_tts(model_name) as tts:
+        samples = np.asarray(tts.tts(**tts_kwargs), dtype=np.float32)
+        return samples, tts.synthesizer.output_sample_rate
+
+
+def group_sentences(sentences, groups):
+    """
+    Merge consecutive sentences into at most `groups` chunks of similar length.
+
+    Args:
+    sentences (list): Sentences in order
+    groups (int): Target number of chunks
+
+    Returns:
+    list: Text chunks in order
+    """
+    target = sum(len(sentence) for sentence in sentences) / max(groups, 1)
+    chunks, current = [], []
+    for sentence in sentences:
+        current.append(sentence)
+        if sum(len(part) for part in current) >= target:
+            chunks.append(" ".join(current))
+            current = []
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def resample(samples, source_rate, target_rate):
+    """
+    Linearly resample float samples.
+
+    Returns:
+    numpy.ndarray: Samples at target_rate
+    """
+    if source_rate == target_rate:
+        return samples
+    duration = len(samples) / source_rate
+    positions = np.linspace(0, len(samples) - 1, int(round(duration * target_rate)))
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def synthesize_parallel(text, model_name, speaker=None, speed=1.0, language=None):
+    """
+    Render text to WAV bytes using the worker pool.
+
+    Args:
+    text (str): Text to synthesise
+    model_name (str): Coqui model name
+    speaker (str): Speaker id for multi-speaker models
+    speed (float): Speaking rate
+    language (str): Language for multi-lingual models
+
+    Returns:
+    bytes: WAV file contents
+
+    Raises:
+    BrokenProcessPool: If a worker died, the caller renders in process instead
+    """
+    sentences = split_sentences(text, settings.TTS_STREAM_MAX_CHARS)
+    # Two chunks per worker keeps every core busy when segments take uneven time.
+    chunks = group_sentences(sentences, settings.TTS_PARALLEL_WORKERS * 2) or [text]
+    rendered = pool.run(_render_segment, [(chunk, model_name, speaker, speed, language) for chunk in chunks])
+
+    sample_rate = rendered[0][1]
+    samples = np.concatenate([resample(segment, rate, sample_rate) for segment, rate in rendered])
+    pcm = to_pcm16(normalize_peak(samples))
+    logger.info(f"Synthesised {len(text)} chars in {len(chunks)} parallel segments")
+    return wav_header(sample_rate, data_size=len(pcm)) + pcm
@@ -0,0 +1,104 @@
+# services.py
+"""
+In-process speech synthesis API.
+
+Pipeline stages call these functions directly and get the WAV bytes back.
+Base64 and JSON encoding only happen in the HTTP views.
+"""
+import logging
+import os
+import tempfile
+from collections import namedtuple
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from .audio_cache import cache_key, tts_cache
+from .parallel import synthesize_parallel
+from .tts_models import is_multi_lingual, use_tts
+
+logger = logging.getLogger(__name__)
+
+SynthesizedSpeech = namedtuple('SynthesizedSpeech', ['content', 'cache_name', 'content_type'])
+
+
+def text_to_speech(text, model_name=None):
+    """
+    Synthesise text with the default voice.
+
+    Args:
+    text (str): Text to synthesise
+    model_name (str): Coqui model name, defaults to TTS_DEFAULT_MODEL
+
+    Returns:
+    SynthesizedSpeech: WAV bytes, the storage name of the shared cache blob (or None) and the content type
+    """
+    model_name = model_name or settings.TTS_DEFAULT_MODEL
+    language = 'en' if is_multi_lingual(model_name) else None
+    content, cache_name = synthesize(text, model_name, language=language)
+    return SynthesizedSpeech(content, cache_name, "audio/wav")
+
+
+def synthesize(text, model_name=None, speaker=None, speed=1.0, language=None):
+    """
+    Render text to WAV bytes, serving repeated utterances from the audio cache.
+
+    Args:
+    text (str): Text to synthesise
+    model_name (str): Coqui model name, defaults to TTS_DEFAULT_MODEL
+    speaker (str): Speaker id for multi-speaker models
+    speed (float): Speaking rate
+    language (str): Language for multi-lingual models, ignored otherwise
+
+    Returns:
+    tuple: (wav bytes, storage name of the shared cache blob or None)
+    """
+    model_name = model_name or settings.TTS_DEFAULT_MODEL
+    if not is_multi_lingual(model_name):
+        language = None
+
+    key = None
+    if settings.TTS_CACHE_ENABLED:
+        key = cache_key(text, model_name, speaker, speed, language)
+        cached = tts_cache.get(key)
+        if cached is not None:
+            return cached
+
+    audio_content = None
+    if settings.TTS_PARALLEL_WORKERS > 1 and len(text) >= settings.TTS_PARALLEL_MIN_CHARS:
+        try:
+            audio_content = synthesize_parallel(text, model_name, speaker, speed, language)
+        except BrokenProcessPool:
+            logger.error("TTS worker pool broke, synthesising in process")
+    if audio_content is None:
+        audio_content = synthesize_single(text, model_name, speaker, speed, language)
+
+    cache_name = tts_cache.put(key, audio_content) if key else None
+    return audio_content, cache_name
+
+
+def synthesize_single(text, model_name, speaker=None, speed=1.0, language=None):
+    """
+    Render text to WAV bytes with the model loaded in this process.
+
+    Returns:
+    bytes: WAV file contents
+    """
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_audio:
+        tts_kwargs = {
+            "text": text,
+            "file_path": temp_audio.name,
+            "speaker": speaker,
+            "speed": speed
+        }
+
+        if is_multi_lingual(model_name):
+            tts_kwargs["language"] = language
+
+        with use_tts(model_name) as tts:
+            tts.tts_to_file(**tts_kwargs)
+
+    with open(temp_audio.name, 'rb') as audio_file:
+        audio_content = audio_file.read()
+    os.unlink(temp_audio.name)
+    return audio_content
@@ -0,0 +1,107 @@
+"""
+Helpers for streaming synthesis: sentence segmentation and chunked WAV/PCM encoding.
+
+Long texts are split into sentences and each sentence is synthesised and sent
+as soon as it is ready, so the client can start playback after the first one
+instead of waiting for the whole text.
+"""
+import re
+import struct
+
+import numpy as np
+
+SENTENCE_END = re.compile(r'(?:(?<=[.!?])|(?<=[.!?]["\')\]]))\s+')
+# Used to break sentences that are too long for a single synthesis call.
+CLAUSE_END = re.compile(r'(?<=[,;:])\s+')
+
+# Streaming WAV convention: unknown sizes are written as 0xFFFFFFFF.
+UNKNOWN_SIZE = 0xFFFFFFFF
+
+
+def split_sentences(text, max_chars=300):
+    """
+    Split text into sentences for incremental synthesis.
+
+    Sentences longer than max_chars are broken at clause boundaries, then at
+    word boundaries, so a single chunk never stalls the stream for long.
+
+    Args:
+    text (str): Text to split
+    max_chars (int): Longest chunk to return
+
+    Returns:
+    list: Non-empty text chunks in order
+    """
+    chunks = []
+    for sentence in SENTENCE_END.split(text.strip()):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if len(sentence) <= max_chars:
+            chunks.append(sentence)
+            continue
+        current = ""
+        for part in _split_long(sentence, max_chars):
+            if current and len(current) + 1 + len(part) > max_chars:
+                chunks.append(current)
+                current = part
+            else:
+                current = f"{current} {part}".strip()
+        if current:
+            chunks.append(current)
+    return chunks
+
+
+def _split_long(sentence, max_chars):
+    for clause in CLAUSE_END.split(sentence):
+        if len(clause) <= max_chars:
+            yield clause
+        else:
+            yield from clause.split()
+
+
+def wav_header(sample_rate, channels=1, sample_width=2, data_size=UNKNOWN_SIZE):
+    """
+    Build a 44-byte PCM WAV header.
+
+    Args:
+    sample_rate (int): Samples per second
+    channels (int): Channel count
+    sample_width (int): Bytes per sample
+    data_size (int): Size of the data chunk, UNKNOWN_SIZE when streaming
+
+    Returns:
+    bytes: The header
+    """
+    riff_size = UNKNOWN_SIZE if data_size == UNKNOWN_SIZE else data_size + 36
+    byte_rate = sample_rate * channels * sample_width
+    return (
+        b"RIFF" + struct.pack("<I", riff_size) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sample_rate, byte_rate, channels * sample_width, sample_width * 8)
+        + b"data" + struct.pack("<I", data_size)
+    )
+
+
+def normalize_peak(samples):
+    """
+    Scale samples to full scale, as Coqui's save_wav does on the single-process path.
+
+    Returns:
+    numpy.ndarray: Float samples in [-1, 1]
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    return samples / max(0.01, float(np.max(np.abs(samples), initial=0)))
+
+
+def to_pcm16(samples):
+    """
+    Convert float samples in [-1, 1] to little-endian 16-bit PCM.
+
+    Args:
+    samples (list or numpy.ndarray): Float samples
+
+    Returns:
+    bytes: PCM data
+    """
+    samples = np.clip(np.asarray(samples, dtype=np.float32), -1.0, 1.0)
+    return (samples * 32767).astype("<i2").tobytes()
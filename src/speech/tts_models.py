@@ -0,0 +1,196 @@
+"""
+Lazily loaded pool of Coqui TTS models.
+
+Nothing is loaded at import time, so management commands and worker boots stay
+fast. A model is loaded the first time a request asks for it and kept in an LRU
+pool bounded by a model count and an optional memory budget, so one process can
+serve several voices.
+
+A loaded model keeps decoder state on itself while it synthesises, so callers
+share it through use_tts(), which serialises inference per model.
+"""
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from src.quantization import model_size_bytes, quantize_int8
+
+logger = logging.getLogger(__name__)
+
+
+def is_multi_lingual(model_name):
+    """
+    Whether the model expects a language argument.
+
+    Args:
+    model_name (str): Coqui model name
+
+    Returns:
+    bool
+    """
+    return "multilingual" in model_name or "multi-dataset" in model_name
+
+
+class TTSModelPool:
+    """
+    Thread-safe LRU pool of TTS models keyed by model name.
+
+    ``max_models`` and ``memory_budget`` (bytes) bound the pool; 0 disables a
+    bound. The model that was just requested is never evicted. With
+    ``dtype='int8'`` the linear layers of the acoustic model and the vocoder
+    are dynamically quantised after loading.
+    """
+
+    def __init__(self, max_models=0, memory_budget=0, allowed_models=None, dtype='float32'):
+        self.max_models = max_models
+        self.memory_budget = memory_budget
+        self.allowed_models = allowed_models
+        self.dtype = dtype
+        self._entries = OrderedDict()  # model name -> {"tts", "size"}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        # Keyed by the model object, so an evicted model still in use keeps its lock
+        self._inference_locks = weakref.WeakKeyDictionary()
+
+    def get(self, model_name=None):
+        """
+        Return a loaded TTS model, loading it on first use.
+
+        Args:
+        model_name (str): Coqui model name, defaults to TTS_DEFAULT_MODEL
+
+        Returns:
+        TTS.api.TTS: The loaded model
+        """
+        model_name = model_name or settings.TTS_DEFAULT_MODEL
+        if self.allowed_models is not None and model_name not in self.allowed_models:
+            raise ValueError(f"TTS model not allowed: {model_name}")
+
+        with self._lock:
+            entry = self._entries.get(model_name)
+            if entry is not None:
+                self._entries.move_to_end(model_name)
+                return entry["tts"]
+            load_lock = self._load_locks.setdefault(model_name, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(model_name)
+                if entry is not None:
+                    self._entries.move_to_end(model_name)
+                    return entry["tts"]
+
+            tts = self._load(model_name)
+            size = model_size_bytes(tts)
+
+            with self._lock:
+                self._entries[model_name] = {"tts": tts, "size": size}
+                self._evict(keep=model_name)
+            return tts
+
+    def inference_lock(self, tts):
+        """
+        The lock serialising inference on one loaded model.
+
+        Returns:
+        threading.Lock
+        """
+        with self._lock:
+            lock = self._inference_locks.get(tts)
+            if lock is None:
+                lock = self._inference_locks[tts] = threading.Lock()
+            return lock
+
+    @contextmanager
+    def use(self, model_name=None):
+        """
+        Get a model and hold its inference lock while the block runs.
+
+            with pool.use(model_name) as tts:
+                samples = tts.tts(text=text)
+        """
+        tts = self.get(model_name)
+        with self.inference_lock(tts):
+            yield tts
+
+    def _load(self, model_name):
+        from TTS.api import TTS
+
+        started = time.monotonic()
+        tts = TTS(model_name=model_name, progress_bar=False)
+        if self.dtype == 'int8':
+            synthesizer = tts.synthesizer
+            synthesizer.tts_model = quantize_int8(synthesizer.tts_model)
+            if synthesizer.vocoder_model is not None:
+                synthesizer.vocoder_model = quantize_int8(synthesizer.vocoder_model)
+        logger.info(f"Loaded TTS model {model_name} ({self.dtype}) in {time.monotonic() - started:.2f}s")
+        return tts
+
+    def _evict(self, keep):
+        # Caller must hold self._lock. Entries are in least recently used order.
+        for model_name in list(self._entries):
+            over_count = self.max_models and len(self._entries) > self.max_models
+            over_memory = self.memory_budget and self.memory_usage() > self.memory_budget
+            if not (over_count or over_memory):
+                break
+            if model_name != keep:
+                self._entries.pop(model_name)
+                self._load_locks.pop(model_name, None)
+                logger.info(f"Evicted TTS model {model_name}")
+
+    def memory_usage(self):
+        """
+        Returns:
+        int: Bytes held by all loaded models
+        """
+        return sum(entry["size"] for entry in self._entries.values())
+
+    def loaded(self):
+        """
+        Returns:
+        list: Names of the models currently loaded
+        """
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self):
+        """Drop every loaded model."""
+        with self._lock:
+            self._entries.clear()
+            self._load_locks.clear()
+
+
+pool = TTSModelPool(
+    max_models=settings.TTS_POOL_MAX_MODELS,
+    memory_budget=settings.TTS_POOL_MEMORY_BUDGET_MB * 1024 * 1024,
+    allowed_models=settings.TTS_ALLOWED_MODELS,
+    dtype=settings.TTS_DTYPE,
+)
+
+
+def get_tts(model_name=None):
+    """
+    Get a shared TTS model from the process-wide pool.
+
+    Returns:
+    TTS.api.TTS: The loaded model
+    """
+    return pool.get(model_name)
+
+
+def use_tts(model_name=None):
+    """
+    Get a shared TTS model and hold its inference lock:
+
+        with use_tts(model_name) as tts:
+            samples = tts.tts(text=text)
+
+    Returns:
+    contextmanager: Yields TTS.api.TTS
+    """
+    return pool.use(model_name)
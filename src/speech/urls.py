@@ -4,4 +4,5 @@ from . import views
 
 urlpatterns = [
     path('tts/', views.text_to_speech_api, name='text_to_speech'),
+    path('tts/stream/', views.text_to_speech_stream_api, name='text_to_speech_stream'),
 ]
\ No newline at end of file
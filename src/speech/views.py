@@ -2,23 +2,25 @@ from django.shortcuts import render
 
 # Create your views here.
 """
-We import the necessary modules, including TTS from the Coqui TTS library.
-We initialize the TTS model. Here, we're using the "tts_models/en/ljspeech/tacotron2-DDC" model, which is an English TTS model. You can change this to other models available in Coqui TTS if needed.
+We import the necessary modules, including the lazily loaded Coqui TTS model pool.
+Models are loaded on first use and cached in tts_models.pool. The default is "tts_models/en/ljspeech/tacotron2-DDC" (settings.TTS_DEFAULT_MODEL), an English TTS model, and requests can ask for another Coqui TTS model listed in settings.TTS_ALLOWED_MODELS with the 'model' field.
 The text_to_speech view function:
 
 Accepts a POST request with JSON data containing the 'text' to be converted to speech.
 """
 
+import io
 import os
 import tempfile
-from django.http import FileResponse, JsonResponse
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
-from TTS.api import TTS
+from django.conf import settings
 import json
-
-tts = TTS(model_name="tts_models/en/ljspeech/tacotron2-DDC", progress_bar=False)
-
+from .tts_models import get_tts, is_multi_lingual, pool
+from .streaming import normalize_peak, split_sentences, to_pcm16, wav_header
+from .services import synthesize
+from . import services
 
 
 @csrf_exempt
@@ -36,36 +38,101 @@ def text_to_speech_api(request):
         if not text:
             return JsonResponse({"error": "No text provided"}, status=400)
         
-        model_name = data.get('model', "tts_models/en/ljspeech/tacotron2-DDC")
+        model_name = data.get('model') or settings.TTS_DEFAULT_MODEL
         speaker = data.get('speaker', None)
         speed = float(data.get('speed', 1.0))
         
-        is_multi_lingual = "multilingual" in model_name or "multi-dataset" in model_name
+        language = data.get('language', 'en') if is_multi_lingual(model_name) else None
+        
+        if str(data.get('stream', 'false')).lower() == 'true':
+            return stream_speech(text, model_name, speaker, speed, language, data.get('format', 'wav'))
         
-        language = data.get('language', 'en') if is_multi_lingual else None
+        audio_content, _ = synthesize(text, model_name, speaker, speed, language)
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_audio:
+        response = FileResponse(io.BytesIO(audio_content), content_type='audio/wav')
+        response['Content-Disposition'] = 'attachment; filename="speech.wav"'
+        
+        return response
+    
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON in request body"}, status=400)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+def stream_speech(text, model_name=None, speaker=None, speed=1.0, language=None, audio_format='wav'):
+    """
+    Synthesise text sentence by sentence into a chunked response.
+    
+    The first chunk is sent as soon as the first sentence is rendered. 'wav'
+    streams a WAV header with unknown length followed by 16-bit PCM; 'pcm' sends
+    raw 16-bit little-endian mono PCM with the rate in the X-Sample-Rate header.
+    
+    Returns:
+    StreamingHttpResponse or JsonResponse: The audio stream, or an error
+    """
+    if audio_format not in ('wav', 'pcm'):
+        return JsonResponse({"error": f"Unsupported stream format: {audio_format}"}, status=400)
+    
+    model_name = model_name or settings.TTS_DEFAULT_MODEL
+    multi_lingual = is_multi_lingual(model_name)
+    sentences = split_sentences(text, settings.TTS_STREAM_MAX_CHARS)
+    tts = get_tts(model_name)
+    sample_rate = tts.synthesizer.output_sample_rate
+    
+    def chunks():
+        if audio_format == 'wav':
+            yield wav_header(sample_rate)
+        for sentence in sentences:
             tts_kwargs = {
-                "text": text,
-                "file_path": temp_audio.name,
+                "text": sentence,
                 "speaker": speaker,
-                "speed": speed
+                "speed": speed,
+                "split_sentences": False
             }
-            
-            if is_multi_lingual:
+            if multi_lingual:
                 tts_kwargs["language"] = language
-            
-            tts.tts_to_file(**tts_kwargs)
+            # Lock per sentence only, a slow client must not hold the model
+            with pool.inference_lock(tts):
+                samples = tts.tts(**tts_kwargs)
+            # Each sentence at full scale, like the whole text on the other paths
+            yield to_pcm16(normalize_peak(samples))
+    
+    content_type = 'audio/wav' if audio_format == 'wav' else 'audio/L16'
+    response = StreamingHttpResponse(chunks(), content_type=content_type)
+    response['X-Sample-Rate'] = str(sample_rate)
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def text_to_speech_stream_api(request):
+    """
+    Streaming variant of text_to_speech_api, accepts the same JSON body plus
+    an optional 'format' of "wav" (default) or "pcm".
+    """
+    try:
+        data = json.loads(request.body.decode('utf-8'))
         
-        response = FileResponse(open(temp_audio.name, 'rb'), content_type='audio/wav')
-        response['Content-Disposition'] = 'attachment; filename="speech.wav"'
+        text = data.get('text')
         
-        os.unlink(temp_audio.name)
+        if not text:
+            return JsonResponse({"error": "No text provided"}, status=400)
         
-        return response
+        model_name = data.get('model') or settings.TTS_DEFAULT_MODEL
+        speaker = data.get('speaker', None)
+        speed = float(data.get('speed', 1.0))
+        language = data.get('language', 'en') if is_multi_lingual(model_name) else None
+        
+        return stream_speech(text, model_name, speaker, speed, language, data.get('format', 'wav'))
     
     except json.JSONDecodeError:
         return JsonResponse({"error": "Invalid JSON in request body"}, status=400)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
 
@@ -78,40 +145,20 @@ import base64
 import tempfile
 # Import any necessary libraries for TTS
 def text_to_speech(request):
+    """
+    JSON edge of services.text_to_speech, with the audio base64-encoded.
+    In-process callers use services.text_to_speech directly.
+    """
     try:
-       
-        model_name = "tts_models/en/ljspeech/tacotron2-DDC"
-        speaker =  None
-        speed = 1.0
-        
-        is_multi_lingual = "multilingual" in model_name or "multi-dataset" in model_name
-        
-        language = 'en' if is_multi_lingual else None
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_audio:
-            tts_kwargs = {
-                "text": request,
-                "file_path": temp_audio.name,
-                "speaker": speaker,
-                "speed": speed
-            }
-            
-            if is_multi_lingual:
-                tts_kwargs["language"] = language
-            
-            tts.tts_to_file(**tts_kwargs)
-        
-        with open(temp_audio.name, 'rb') as audio_file:
-            audio_content = audio_file.read()
-
-        audio_base64 = base64.b64encode(audio_content).decode('utf-8')
+        speech = services.text_to_speech(request)
 
-        os.unlink(temp_audio.name)
+        audio_base64 = base64.b64encode(speech.content).decode('utf-8')
 
         return Response({
             "audio_base64": audio_base64,
-            "content_type": "audio/wav",
-            "filename": "speech.wav"
+            "content_type": speech.content_type,
+            "filename": "speech.wav",
+            "cache_name": speech.cache_name
         })
     
     except json.JSONDecodeError:
@@ -143,6 +190,8 @@ jsonCopy{
     "speed": 1.0
 }
 This implementation should resolve the error you were seeing. It will use the language parameter only when appropriate for the selected model.
-Remember to adjust the model initialization at the top of the file if you want to use a different default model:
-tts = TTS(model_name="your_preferred_model_name", progress_bar=False)
+To use a different default model, set TTS_DEFAULT_MODEL (settings or environment):
+TTS_DEFAULT_MODEL=your_preferred_model_name
+Other models have to be listed, comma-separated, in TTS_ALLOWED_MODELS (default: TTS_DEFAULT_MODEL only).
+Models are loaded lazily and kept in an LRU pool capped by TTS_POOL_MAX_MODELS and TTS_POOL_MEMORY_BUDGET_MB.
 """
\ No newline at end of file
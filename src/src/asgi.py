@@ -2,6 +2,8 @@
 ASGI config for src project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP requests go to Django; WebSocket connections to ws/transcribe/ go to the
+live transcription handler in text/live_transcription.py.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -13,4 +15,29 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'src.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from src import runtime  # noqa: E402  (needs Django set up)
+from text import jobs  # noqa: E402
+from text.live_transcription import transcribe_socket  # noqa: E402
+
+runtime.configure()
+# After configure: torch's inter-op threads can only be set before the first parallel work.
+runtime.warm_up()
+# Jobs queued or left running before a restart
+jobs.resume()
+
+websocket_routes = {
+    '/ws/transcribe/': transcribe_socket,
+}
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        handler = websocket_routes.get(scope['path'])
+        if handler is None:
+            await receive()
+            await send({"type": "websocket.close", "code": 4404})
+            return
+        return await handler(scope, receive, send)
+    return await django_application(scope, receive, send)
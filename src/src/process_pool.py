@@ -0,0 +1,86 @@
+# process_pool.py
+"""
+Lazily started pools of spawned worker processes.
+
+Long TTS texts (speech/parallel.py) and long recordings (text/long_form.py)
+are split across worker processes, each with its own loaded model. A pool is
+sized by a settings name and started on first use. If a worker dies (e.g. it
+is killed for running out of memory) the pool is broken; it is then dropped
+so the next call starts a fresh one, and the caller falls back to working in
+process.
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker(num_threads):
+    # Workers are spawned, so Django has to be set up again in each of them.
+    import django
+    import torch
+
+    django.setup()
+    torch.set_num_threads(num_threads)
+
+
+class SpawnPool:
+    """
+    A ProcessPoolExecutor with WORKERS_SETTING processes of THREADS_SETTING torch threads each.
+    """
+
+    def __init__(self, workers_setting, threads_setting):
+        self.workers_setting = workers_setting
+        self.threads_setting = threads_setting
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def workers(self):
+        return getattr(settings, self.workers_setting)
+
+    def get(self):
+        """
+        Returns:
+        concurrent.futures.ProcessPoolExecutor
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(getattr(settings, self.threads_setting),),
+                )
+            return self._executor
+
+    def reset(self, executor):
+        """Drop a broken executor, unless it has been replaced already."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, fn, calls):
+        """
+        Run fn(*args) for every args tuple in calls on the pool.
+
+        Returns:
+        list: Results in the order of calls
+
+        Raises:
+        BrokenProcessPool: If a worker died; the pool has been dropped
+        """
+        executor = self.get()
+        try:
+            futures = [executor.submit(fn, *args) for args in calls]
+            return [future.result() for future in futures]
+        except BrokenProcessPool:
+            logger.error(f"{self.workers_setting} pool broke, starting a new one on next use")
+            self.reset(executor)
+            raise
@@ -0,0 +1,44 @@
+# quantization.py
+"""
+Model size and dynamic int8 quantisation helpers shared by the Whisper
+(text/whisper_models.py) and Coqui TTS (speech/tts_models.py) model pools.
+"""
+
+
+def model_size_bytes(model):
+    """
+    Estimate the memory held by a model's parameters and buffers.
+
+    The state dict is used rather than parameters() so that the packed
+    weights of quantised layers are counted too.
+
+    Args:
+    model (torch.nn.Module): Loaded model
+
+    Returns:
+    int: Size in bytes
+    """
+    import torch
+
+    tensors = [t for t in model.state_dict().values() if isinstance(t, torch.Tensor)]
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+def quantize_int8(model):
+    """
+    Apply dynamic int8 quantisation to the linear layers of a CPU model.
+
+    Weights are stored as int8 and activations are quantised on the fly, which
+    cuts the memory of the linear layers by about 4x and speeds up CPU
+    inference. Only layers whose type is exactly nn.Linear are converted, so
+    subclasses such as nn.MultiheadAttention's out_proj keep working.
+
+    Args:
+    model (torch.nn.Module): fp32 model on the CPU
+
+    Returns:
+    torch.nn.Module: The quantised model
+    """
+    import torch
+
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
@@ -0,0 +1,191 @@
+# runtime.py
+"""
+Per-process torch threading and CPU affinity.
+
+By default every worker process lets torch use all cores for intra-op work,
+so N gunicorn workers running Whisper or TTS at the same time oversubscribe
+the machine and latency jitters. configure() runs once per worker (from
+src.wsgi / src.asgi) and:
+
+- pins the process to a set of cores (TORCH_CPU_AFFINITY),
+- sets torch's intra-op threads (TORCH_NUM_THREADS) and inter-op threads
+  (TORCH_INTEROP_THREADS).
+
+TORCH_CPU_AFFINITY is either empty (no pinning), 'auto' (split the available
+cores evenly between WEB_CONCURRENCY workers) or explicit core sets per worker
+separated by ';', e.g. '0-3;4-7'. Each worker claims the first free slot by
+locking a file, so a restarted worker takes over the slot of the one it
+replaced. With TORCH_NUM_THREADS = 0 a pinned worker uses one thread per core
+it owns and an unpinned one its share of all cores.
+"""
+import logging
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_state = {}
+_lock = threading.Lock()
+
+
+def parse_cores(spec):
+    """
+    Parse a core list such as '0-3,6'.
+
+    Returns:
+    set: Core ids
+    """
+    cores = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-')
+            cores.update(range(int(start), int(end) + 1))
+        else:
+            cores.add(int(part))
+    return cores
+
+
+def available_cores():
+    """
+    Returns:
+    list: Cores this process may run on, sorted
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def core_slots(affinity, workers, cores):
+    """
+    Core sets for each worker slot.
+
+    Args:
+    affinity (str): TORCH_CPU_AFFINITY
+    workers (int): Number of worker processes
+    cores (list): Available cores
+
+    Returns:
+    list: One set of cores per slot, empty when pinning is off
+    """
+    if not affinity:
+        return []
+    if affinity == 'auto':
+        workers = max(1, min(workers, len(cores)))
+        size = len(cores) // workers
+        return [set(cores[i * size:(i + 1) * size]) for i in range(workers)]
+    return [parse_cores(spec) for spec in affinity.split(';') if spec.strip()]
+
+
+def claim_slot(slots):
+    """
+    Lock the first free slot file. The file stays locked until the process exits.
+
+    Returns:
+    int: Slot index, or None if every slot is taken or slots are unsupported
+    """
+    try:
+        import fcntl
+    except ImportError:
+        # Windows: no flock, run unpinned
+        logger.warning("CPU slots need fcntl, which this platform lacks; running unpinned")
+        return None
+    for index in range(slots):
+        path = os.path.join(tempfile.gettempdir(), f'torch-runtime-slot-{index}.lock')
+        handle = open(path, 'w')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            continue
+        _state['slot_handle'] = handle
+        return index
+    return None
+
+
+def configure(num_threads=None, interop_threads=None, affinity=None, workers=None):
+    """
+    Apply the thread and affinity settings to this process. Only the first call has an effect.
+
+    Arguments override the corresponding settings.
+
+    Returns:
+    dict: The effective configuration, as returned by describe()
+    """
+    with _lock:
+        if _state.get('configured'):
+            return describe()
+        import torch
+
+        affinity = settings.TORCH_CPU_AFFINITY if affinity is None else affinity
+        workers = workers or settings.WEB_CONCURRENCY
+        slots = core_slots(affinity, workers, available_cores())
+        slot = claim_slot(len(slots)) if slots else None
+        if slot is not None and hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, slots[slot])
+        elif slots:
+            logger.warning(f"No free CPU slot among {len(slots)}, running unpinned")
+
+        num_threads = num_threads or settings.TORCH_NUM_THREADS
+        if not num_threads:
+            # A pinned worker owns its cores; an unpinned one gets its share of the machine.
+            cores = len(available_cores())
+            num_threads = cores if slot is not None else max(1, cores // workers)
+        torch.set_num_threads(num_threads)
+        interop_threads = interop_threads or settings.TORCH_INTEROP_THREADS
+        if interop_threads:
+            try:
+                torch.set_num_interop_threads(interop_threads)
+            except RuntimeError as e:
+                # Only possible before the first parallel torch op in this process.
+                logger.warning(f"Could not set inter-op threads: {e}")
+
+        _state.update(configured=True, slot=slot)
+        config = describe()
+        logger.info(f"Torch runtime: {config}")
+        return config
+
+
+def warm_up():
+    """
+    Load the Whisper models ahead of the first request when WHISPER_WARMUP is on.
+    Called by src.wsgi / src.asgi after configure(), so it never runs for
+    management commands such as migrate.
+    """
+    if not settings.WHISPER_WARMUP:
+        return
+    from text.whisper_models import registry
+
+    registry.warm_up()
+
+
+def describe():
+    """
+    The effective runtime configuration of this process.
+
+    Returns:
+    dict
+    """
+    import torch
+
+    return {
+        "pid": os.getpid(),
+        "configured": bool(_state.get('configured')),
+        "slot": _state.get('slot'),
+        "cpu_count": os.cpu_count(),
+        "affinity": available_cores(),
+        "num_threads": torch.get_num_threads(),
+        "interop_threads": torch.get_num_interop_threads(),
+        "torch_version": torch.__version__,
+        "settings": {
+            "TORCH_NUM_THREADS": settings.TORCH_NUM_THREADS,
+            "TORCH_INTEROP_THREADS": settings.TORCH_INTEROP_THREADS,
+            "TORCH_CPU_AFFINITY": settings.TORCH_CPU_AFFINITY,
+            "WEB_CONCURRENCY": settings.WEB_CONCURRENCY,
+        },
+    }
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -90,12 +91,41 @@ WSGI_APPLICATION = 'src.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE selects the profile:
+# - 'sqlite' (default): single node. WAL lets readers run while a request writes, and
+#   IMMEDIATE transactions with a busy timeout queue writers instead of failing with "database is locked".
+# - 'postgres': the database started by docker-compose. Connections are kept for
+#   DB_CONN_MAX_AGE seconds instead of being opened on every request.
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'django_db'),
+            'USER': os.environ.get('POSTGRES_USER', 'django_user'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', 'django_password'),
+            'HOST': os.environ.get('POSTGRES_HOST', 'db'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    'PRAGMA busy_timeout=5000;'
+                ),
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
     }
-}
 
 
 # Password validation
@@ -142,9 +172,162 @@ import os
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Media is served by src/media.py (byte ranges, ETag/Last-Modified). Set MEDIA_SENDFILE_BACKEND to
+# 'x-sendfile' or 'x-accel-redirect' to let the web server send the files; for nginx, map
+# MEDIA_ACCEL_REDIRECT_PREFIX to MEDIA_ROOT in an internal location.
+MEDIA_SENDFILE_BACKEND = os.environ.get('MEDIA_SENDFILE_BACKEND') or None
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get('MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+MEDIA_CACHE_MAX_AGE = int(os.environ.get('MEDIA_CACHE_MAX_AGE', '86400'))
 
 STATIC_URL = '/static/'
 
+
+# Torch runtime (src/runtime.py), applied once per web worker process.
+# WEB_CONCURRENCY is the number of worker processes (gunicorn reads the same variable).
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', '1'))
+# 0 = one thread per core a pinned worker owns, or cores / WEB_CONCURRENCY when unpinned.
+TORCH_NUM_THREADS = int(os.environ.get('TORCH_NUM_THREADS', '0'))
+TORCH_INTEROP_THREADS = int(os.environ.get('TORCH_INTEROP_THREADS', '1'))
+# '' (no pinning), 'auto' (split the cores between workers) or core sets per worker, e.g. '0-3;4-7'.
+TORCH_CPU_AFFINITY = os.environ.get('TORCH_CPU_AFFINITY', '')
+
+# Whisper speech-to-text
+# Models are loaded once per worker process and shared between requests.
+
+WHISPER_MODEL = os.environ.get('WHISPER_MODEL', 'base')
+WHISPER_DEVICE = os.environ.get('WHISPER_DEVICE') or None  # None picks cuda when available
+# float32, float16 (GPU) or int8 (dynamic quantisation of the linear layers, CPU only).
+WHISPER_DTYPE = os.environ.get('WHISPER_DTYPE', 'float32')
+# Load and exercise these models when the app starts instead of on the first request.
+WHISPER_WARMUP = os.environ.get('WHISPER_WARMUP', 'false').lower() == 'true'
+WHISPER_WARMUP_MODELS = [WHISPER_MODEL]
+# Sizes a client may ask for (model= on ws/transcribe/); anything else is refused rather than downloaded.
+WHISPER_ALLOWED_MODELS = os.environ.get('WHISPER_ALLOWED_MODELS', WHISPER_MODEL).split(',')
+# 0 disables eviction.
+WHISPER_MEMORY_BUDGET_MB = int(os.environ.get('WHISPER_MEMORY_BUDGET_MB', '0'))
+WHISPER_IDLE_TIMEOUT = int(os.environ.get('WHISPER_IDLE_TIMEOUT', '0'))
+# Micro-batching: concurrent transcriptions are collected for WHISPER_BATCH_WINDOW seconds
+# (or until WHISPER_BATCH_SIZE clips) and decoded in one pass.
+WHISPER_BATCHING = os.environ.get('WHISPER_BATCHING', 'false').lower() == 'true'
+WHISPER_BATCH_SIZE = int(os.environ.get('WHISPER_BATCH_SIZE', '8'))
+WHISPER_BATCH_WINDOW = float(os.environ.get('WHISPER_BATCH_WINDOW', '0.05'))
+# Recordings of at least WHISPER_LONG_FORM_MIN_SECONDS are cut at quiet points into chunks of
+# about WHISPER_LONG_FORM_CHUNK_SECONDS (plus overlap) and transcribed by a process pool.
+# 0 or 1 workers disables it (the default): every web worker would start its own pool.
+WHISPER_LONG_FORM_WORKERS = int(os.environ.get('WHISPER_LONG_FORM_WORKERS', '0'))
+WHISPER_LONG_FORM_THREADS_PER_WORKER = int(os.environ.get('WHISPER_LONG_FORM_THREADS_PER_WORKER', '1'))
+WHISPER_LONG_FORM_MIN_SECONDS = int(os.environ.get('WHISPER_LONG_FORM_MIN_SECONDS', '120'))
+WHISPER_LONG_FORM_CHUNK_SECONDS = int(os.environ.get('WHISPER_LONG_FORM_CHUNK_SECONDS', '60'))
+WHISPER_LONG_FORM_OVERLAP_SECONDS = float(os.environ.get('WHISPER_LONG_FORM_OVERLAP_SECONDS', '2'))
+# Live transcription over ws/transcribe/: partial transcripts every STEP seconds of new audio,
+# a final one after SILENCE seconds below the RMS THRESHOLD or MAX seconds of speech.
+WHISPER_STREAM_STEP_SECONDS = float(os.environ.get('WHISPER_STREAM_STEP_SECONDS', '1.0'))
+WHISPER_STREAM_SILENCE_SECONDS = float(os.environ.get('WHISPER_STREAM_SILENCE_SECONDS', '0.8'))
+WHISPER_STREAM_SILENCE_THRESHOLD = float(os.environ.get('WHISPER_STREAM_SILENCE_THRESHOLD', '0.01'))
+WHISPER_STREAM_MAX_SECONDS = float(os.environ.get('WHISPER_STREAM_MAX_SECONDS', '28'))
+
+
+# Coqui text-to-speech
+# Models are loaded on first use and kept in a per-process LRU pool.
+
+TTS_DEFAULT_MODEL = os.environ.get('TTS_DEFAULT_MODEL', 'tts_models/en/ljspeech/tacotron2-DDC')
+# Model names a client may send in the 'model' field; anything else is refused rather than downloaded.
+TTS_ALLOWED_MODELS = os.environ.get('TTS_ALLOWED_MODELS', TTS_DEFAULT_MODEL).split(',')
+# 0 disables the bound.
+TTS_POOL_MAX_MODELS = int(os.environ.get('TTS_POOL_MAX_MODELS', '2'))
+TTS_POOL_MEMORY_BUDGET_MB = int(os.environ.get('TTS_POOL_MEMORY_BUDGET_MB', '0'))
+# float32 or int8 (dynamic quantisation of the linear layers, CPU only).
+# `python manage.py benchmark_quantization` compares accuracy and speed of both modes.
+TTS_DTYPE = os.environ.get('TTS_DTYPE', 'float32')
+# Rendered audio is cached under MEDIA_ROOT/TTS_CACHE_DIR, keyed by text, model, speaker, speed and language.
+TTS_CACHE_ENABLED = os.environ.get('TTS_CACHE_ENABLED', 'true').lower() == 'true'
+TTS_CACHE_DIR = 'tts_cache'
+TTS_CACHE_MAX_MB = int(os.environ.get('TTS_CACHE_MAX_MB', '512'))
+# Blobs hit or written this recently are never evicted: their File row may not be saved yet.
+TTS_CACHE_GRACE_SECONDS = int(os.environ.get('TTS_CACHE_GRACE_SECONDS', '300'))
+# Longest text chunk synthesised at once by the streaming endpoint.
+TTS_STREAM_MAX_CHARS = 300
+# Texts of at least TTS_PARALLEL_MIN_CHARS are split into sentence groups rendered by
+# TTS_PARALLEL_WORKERS processes, each with its own model. 0 or 1 workers disables it
+# (the default): every web worker would start its own pool.
+TTS_PARALLEL_WORKERS = int(os.environ.get('TTS_PARALLEL_WORKERS', '0'))
+TTS_PARALLEL_THREADS_PER_WORKER = int(os.environ.get('TTS_PARALLEL_THREADS_PER_WORKER', '1'))
+TTS_PARALLEL_MIN_CHARS = int(os.environ.get('TTS_PARALLEL_MIN_CHARS', '600'))
+# Codec of the audio stored on File.output_audio: 'opus' (OGG), 'mp3' or 'wav' (uncompressed).
+# `python manage.py reencode_audio` converts files stored with another codec.
+AUDIO_STORAGE_CODEC = os.environ.get('AUDIO_STORAGE_CODEC', 'opus')
+AUDIO_STORAGE_BITRATE = os.environ.get('AUDIO_STORAGE_BITRATE', '32k')
+
+
+# Conversation context sent with each chat turn (text/context.py): the most recent turns within
+# CHAT_CONTEXT_TOKENS tokens (tiktoken CHAT_CONTEXT_ENCODING), after a rolling summary of older turns.
+# 0 sends only the current input.
+CHAT_CONTEXT_TOKENS = int(os.environ.get('CHAT_CONTEXT_TOKENS', '1024'))
+CHAT_CONTEXT_MAX_TURNS = int(os.environ.get('CHAT_CONTEXT_MAX_TURNS', '20'))
+CHAT_CONTEXT_ENCODING = os.environ.get('CHAT_CONTEXT_ENCODING', 'cl100k_base')
+CHAT_SUMMARY_ENABLED = str(os.environ.get('CHAT_SUMMARY_ENABLED', 'True')).lower() == 'true'
+# Longest input sent to the summary model when folding turns into the summary.
+CHAT_SUMMARY_INPUT_TOKENS = int(os.environ.get('CHAT_SUMMARY_INPUT_TOKENS', '900'))
+
+# Background chat jobs (POST /api/text/chat/ with async=true)
+# 'thread' runs jobs on a pool inside the web process, 'worker' leaves them to `manage.py run_chat_jobs`.
+CHAT_JOB_BACKEND = os.environ.get('CHAT_JOB_BACKEND', 'thread')
+CHAT_JOB_WORKERS = int(os.environ.get('CHAT_JOB_WORKERS', '2'))
+CHAT_JOB_EVENTS_POLL_INTERVAL = 0.5
+CHAT_JOB_EVENTS_TIMEOUT = 600
+# Under WSGI an event stream holds a worker thread, so it is closed after this many seconds
+# and the client's EventSource reconnects. Under ASGI it waits without a thread.
+CHAT_JOB_EVENTS_WSGI_TIMEOUT = 25
+# Running jobs whose row has not changed for this many seconds were lost with their process
+# (restart, crash) and are queued again.
+CHAT_JOB_STALE_SECONDS = int(os.environ.get('CHAT_JOB_STALE_SECONDS', '900'))
+# Image and audio generation for a chat turn run concurrently; a branch that takes
+# longer than its timeout (seconds) is not waited for and saves its file when it finishes.
+CHAT_BRANCH_WORKERS = int(os.environ.get('CHAT_BRANCH_WORKERS', '8'))
+CHAT_IMAGE_TIMEOUT = int(os.environ.get('CHAT_IMAGE_TIMEOUT', '120'))
+CHAT_AUDIO_TIMEOUT = int(os.environ.get('CHAT_AUDIO_TIMEOUT', '120'))
+
+
+# Generated images. Upstream images already in one of IMAGE_PASSTHROUGH_FORMATS are stored
+# unchanged; others are transcoded to IMAGE_OUTPUT_FORMAT (JPEG, WEBP or AVIF with a Pillow plugin).
+IMAGE_OUTPUT_FORMAT = os.environ.get('IMAGE_OUTPUT_FORMAT', 'JPEG')
+IMAGE_OUTPUT_QUALITY = int(os.environ.get('IMAGE_OUTPUT_QUALITY', '85'))
+IMAGE_PASSTHROUGH_FORMATS = ['JPEG', 'WEBP', 'AVIF']
+# WebP variants written next to every stored chat image (name -> longer side in pixels).
+IMAGE_VARIANTS = {'small': 256, 'medium': 512}
+# Variant stored in File.output_thumbnail, '' leaves the field empty.
+IMAGE_THUMBNAIL_VARIANT = os.environ.get('IMAGE_THUMBNAIL_VARIANT', 'small')
+IMAGE_VARIANT_QUALITY = int(os.environ.get('IMAGE_VARIANT_QUALITY', '80'))
+
+# Hugging Face inference API
+# Point HF_INFERENCE_BASE_URL at a local stub server to run without the real API.
+HF_INFERENCE_BASE_URL = os.environ.get('HF_INFERENCE_BASE_URL', 'https://api-inference.huggingface.co').rstrip('/')
+HF_HTTP_CONNECT_TIMEOUT = float(os.environ.get('HF_HTTP_CONNECT_TIMEOUT', '5'))
+HF_HTTP_READ_TIMEOUT = float(os.environ.get('HF_HTTP_READ_TIMEOUT', '120'))
+# Retries on 503 "model loading" (waiting the API's estimated_time), 429/502/504 and connection errors.
+HF_HTTP_MAX_RETRIES = int(os.environ.get('HF_HTTP_MAX_RETRIES', '3'))
+HF_HTTP_BACKOFF = 1.0
+HF_HTTP_MAX_BACKOFF = 30.0
+HF_HTTP_POOL_SIZE = int(os.environ.get('HF_HTTP_POOL_SIZE', '10'))
+# Responses of the text and summary models are cached per (model URL, payload): in process,
+# and optionally in a shared Django cache (set HF_RESPONSE_CACHE_BACKEND=hf_responses).
+HF_RESPONSE_CACHE_ENABLED = os.environ.get('HF_RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+HF_RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('HF_RESPONSE_CACHE_MAX_ENTRIES', '1000'))
+HF_RESPONSE_CACHE_TTL = int(os.environ.get('HF_RESPONSE_CACHE_TTL', '86400'))
+HF_RESPONSE_CACHE_BACKEND = os.environ.get('HF_RESPONSE_CACHE_BACKEND') or None
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'hf_responses': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'hf_responses'),
+        'TIMEOUT': HF_RESPONSE_CACHE_TTL,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
 """
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
@@ -15,8 +15,10 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+import re
+from django.urls import path, re_path, include
 from . import views
+from .media import serve_media
 from django.conf import settings
 from django.conf.urls.static import static
 
@@ -31,10 +33,13 @@ urlpatterns = [
     
     path('api/interface/history.html', views.history_html, name='History html'),
     
-    path('api/models/', include('image_gen.urls'), name= 'Modles like image, text ans summary generation.')
+    path('api/models/', include('image_gen.urls'), name= 'Modles like image, text ans summary generation.'),
+    
+    path('api/runtime/', views.runtime_diagnostics, name='runtime_diagnostics'),
+    
+    re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve_media, name='media'),
     
 ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
 
 if settings.DEBUG:
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
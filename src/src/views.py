@@ -1,7 +1,19 @@
 # views.py
+from django.conf import settings
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from . import runtime
+
 def my_html_view(request):
     return render(request, 'index.html')
 def history_html(request):
-    return render(request, 'history.html')
\ No newline at end of file
+    return render(request, 'history.html')
+def runtime_diagnostics(request):
+    """
+    Torch threading and CPU affinity of the worker that served the request.
+    Only with DEBUG or for staff users, it describes the host.
+    """
+    if not (settings.DEBUG or request.user.is_staff):
+        return JsonResponse({"error": "Forbidden"}, status=403)
+    return JsonResponse(runtime.describe())
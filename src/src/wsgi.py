@@ -14,3 +14,12 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'src.settings')
 
 application = get_wsgi_application()
+
+from src import runtime  # noqa: E402  (needs Django set up)
+from text import jobs  # noqa: E402
+
+runtime.configure()
+# After configure: torch's inter-op threads can only be set before the first parallel work.
+runtime.warm_up()
+# Jobs queued or left running before a restart
+jobs.resume()
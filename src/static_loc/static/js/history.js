@@ -56,7 +56,7 @@ async function fetchChatHistory() {
                             displayAudioPlayer(file.output_audio);
                         }
                         if (file.output_image) {
-                            displayImage(file.output_image);
+                            displayImage(file.output_image, file.output_image_variants);
                         }
                     });
                 }
@@ -98,7 +98,7 @@ function displayAudioPlayer(audioUrl) {
     downloadButton.addEventListener('click', () => {
         const link = document.createElement('a');
         link.href = fullAudioUrl;
-        link.download = 'audio.wav';
+        link.download = 'audio' + fullAudioUrl.substring(fullAudioUrl.lastIndexOf('.'));
         link.click();
     });
 
@@ -107,14 +107,14 @@ function displayAudioPlayer(audioUrl) {
     historyContent.appendChild(audioContainer);
 }
 
-// Display image
-function displayImage(imageUrl) {
+// Display image: the small variant inline, the full image only when opened
+function displayImage(imageUrl, variants) {
     const imageContainer = document.createElement('div');
     imageContainer.classList.add('image-container');
 
     const img = document.createElement('img');
     const fullImageUrl = getMediaUrl(imageUrl);
-    img.src = fullImageUrl;
+    img.src = variants && variants.small ? getMediaUrl(variants.small) : fullImageUrl;
     img.alt = 'Generated Image';
     img.classList.add('image-thumbnail');
 
@@ -130,7 +130,6 @@ function displayImage(imageUrl) {
     const overlay = document.createElement('div');
     overlay.classList.add('fullscreen-overlay');
     const fullscreenImg = document.createElement('img');
-    fullscreenImg.src = fullImageUrl;
     fullscreenImg.alt = 'Fullscreen Image';
     fullscreenImg.classList.add('fullscreen-image');
     overlay.appendChild(fullscreenImg);
@@ -138,6 +137,9 @@ function displayImage(imageUrl) {
 
     // Add click event to show fullscreen
     img.addEventListener('click', () => {
+        if (!fullscreenImg.src) {
+            fullscreenImg.src = fullImageUrl;
+        }
         overlay.style.display = 'flex';
     });
 
@@ -189,7 +191,7 @@ async function deleteChat() {
 
 // Helper functions
 function getMediaUrl(path) {
-    return path.startsWith('/media/') ? path : '/media/' + path;
+    return path.startsWith('/media/') || /^https?:\/\//.test(path) ? path : '/media/' + path;
 }
 
 function getCookie(name) {
@@ -201,8 +201,14 @@ async function fetchChatHistory() {
 
 // Update history list
 async function updateHistoryList() {
+    historyList.innerHTML = ''; // Clear existing history list
+    await loadHistoryPage('/api/text/querychat/list_chats/');
+}
+
+// Append one page of the cursor-paginated chat list, newest first
+async function loadHistoryPage(url) {
     try {
-        const response = await fetch('/api/text/querychat/list_chats/', {
+        const response = await fetch(url, {
             headers: {
                 'X-CSRFToken': getCookie('csrftoken')
             }
@@ -212,15 +218,11 @@ async function updateHistoryList() {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
 
-        const chats = await response.json();
-
-        historyList.innerHTML = ''; // Clear existing history list
+        const page = await response.json();
+        const chats = page.results;
 
         if (chats && chats.length > 0) {
-            // Sort chats by updated_at field in descending order (most recent first)
-            const sortedChats = chats.sort((a, b) => new Date(b.updated_at) - new Date(a.updated_at));
-
-            sortedChats.forEach((chat) => {
+            chats.forEach((chat) => {
                 const li = document.createElement('li');
                 
                 // Create a span for the chat title
@@ -243,11 +245,23 @@ async function updateHistoryList() {
                 });
                 historyList.appendChild(li);
             });
-        } else {
+        } else if (!historyList.hasChildNodes()) {
             const li = document.createElement('li');
             li.textContent = 'No chat history available';
             historyList.appendChild(li);
         }
+
+        if (page.next) {
+            // Older chats are fetched only when asked for
+            const more = document.createElement('li');
+            more.textContent = 'Load more';
+            more.classList.add('load-more');
+            more.addEventListener('click', () => {
+                more.remove();
+                loadHistoryPage(page.next);
+            });
+            historyList.appendChild(more);
+        }
     } catch (error) {
         showError('Error updating history list: ' + error.message);
     }
@@ -331,7 +345,7 @@ function displayMessage(message, isUser) {
 
 function getMediaUrl(path) {
     let url;
-    if (path.startsWith('/media/')) {
+    if (path.startsWith('/media/') || /^https?:\/\//.test(path)) {
         url = path;
     } else {
         url = '/media/' + path;
@@ -361,7 +375,7 @@ function displayAudioPlayer(audioUrl) {
     downloadButton.addEventListener('click', () => {
         const link = document.createElement('a');
         link.href = fullAudioUrl;
-        link.download = 'audio.wav';
+        link.download = 'audio' + fullAudioUrl.substring(fullAudioUrl.lastIndexOf('.'));
         link.click();
     });
 
@@ -1,7 +1,8 @@
 from django.contrib import admin
-from .models import Chat, History, File, Errors
+from .models import Chat, History, File, Errors, ChatJob
 # Register your models here.
 admin.site.register(Chat)
 admin.site.register(History)
 admin.site.register(File)
 admin.site.register(Errors)
+admin.site.register(ChatJob)
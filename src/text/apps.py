@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class TextConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'text'
+
+    def ready(self):
+        from . import image_variants  # noqa: F401  (connects the post_save handler)
+
+        # Whisper warm-up runs from wsgi.py / asgi.py once src.runtime has configured
+        # torch threads, and not at all for management commands.
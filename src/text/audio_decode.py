@@ -0,0 +1,155 @@
+# audio_decode.py
+"""
+Decode uploaded audio straight into the array Whisper consumes.
+
+The upload bytes are piped through a single ffmpeg process that outputs 16 kHz
+mono 16-bit PCM, which is converted to float32 in memory. No intermediate WAV
+file is written and Whisper does not decode the audio a second time.
+"""
+import os
+import subprocess
+import tempfile
+import threading
+
+import numpy as np
+from whisper.audio import SAMPLE_RATE, load_audio
+
+
+def read_upload(source):
+    """
+    Read all bytes from an upload, a file-like object or a bytes buffer.
+
+    Args:
+    source (bytes, UploadedFile or file-like): Audio input
+
+    Returns:
+    bytes: Raw file contents
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    if hasattr(source, 'chunks'):
+        return b''.join(source.chunks())
+    return source.read()
+
+
+def ffmpeg_decode(data, sample_rate=SAMPLE_RATE, input_path='pipe:0'):
+    """
+    Run ffmpeg and return mono float32 samples at the given rate.
+
+    Raises:
+    RuntimeError: If ffmpeg cannot decode the input
+    """
+    cmd = [
+        'ffmpeg', '-nostdin', '-threads', '0',
+        '-i', input_path,
+        '-f', 's16le', '-ac', '1', '-acodec', 'pcm_s16le', '-ar', str(sample_rate),
+        '-',
+    ]
+    result = subprocess.run(cmd, input=data, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Failed to decode audio: {result.stderr.decode(errors='ignore').strip()[-500:]}")
+    return np.frombuffer(result.stdout, np.int16).astype(np.float32) / 32768.0
+
+
+def decode_audio(source, sample_rate=SAMPLE_RATE, suffix=''):
+    """
+    Decode audio to a mono float32 NumPy array ready for model.transcribe.
+
+    Args:
+    source (str, bytes, UploadedFile or file-like): A local path or the audio itself
+    sample_rate (int): Output sample rate, Whisper expects 16 kHz
+    suffix (str): Original file extension, used only by the seekable fallback
+
+    Returns:
+    numpy.ndarray: float32 samples in [-1, 1]
+    """
+    if isinstance(source, str):
+        return load_audio(source, sr=sample_rate)
+
+    data = read_upload(source)
+    try:
+        return ffmpeg_decode(data, sample_rate)
+    except RuntimeError:
+        # Some containers (e.g. MP4/M4A with the index at the end) need a
+        # seekable input and cannot be read from a pipe.
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                temp_file.write(data)
+            return ffmpeg_decode(None, sample_rate, input_path=path)
+        finally:
+            os.remove(path)
+
+
+class FFmpegStream:
+    """
+    One long-lived ffmpeg process decoding a stream that arrives in pieces.
+
+    Encoded chunks are written to ffmpeg's stdin as they arrive and the PCM it
+    produces is collected from stdout by a reader thread, so every byte is
+    decoded once and only undelivered samples are kept in memory.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE):
+        cmd = [
+            'ffmpeg', '-nostdin', '-loglevel', 'error', '-fflags', 'nobuffer',
+            '-i', 'pipe:0',
+            '-f', 's16le', '-ac', '1', '-acodec', 'pcm_s16le', '-ar', str(sample_rate),
+            '-flush_packets', '1', '-',
+        ]
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        self._pcm = bytearray()
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read_stdout, name='ffmpeg-stream', daemon=True)
+        self._reader.start()
+
+    def _read_stdout(self):
+        while True:
+            chunk = self.process.stdout.read1(65536)
+            if not chunk:
+                break
+            with self._lock:
+                self._pcm.extend(chunk)
+
+    def write(self, data):
+        """
+        Feed encoded bytes.
+
+        Raises:
+        RuntimeError: If ffmpeg has exited (the stream could not be decoded)
+        """
+        try:
+            self.process.stdin.write(data)
+            self.process.stdin.flush()
+        except (BrokenPipeError, ValueError):
+            raise RuntimeError("ffmpeg stopped decoding the stream")
+
+    def read(self):
+        """
+        Returns:
+        numpy.ndarray: float32 samples decoded since the last call
+        """
+        with self._lock:
+            usable = len(self._pcm) - len(self._pcm) % 2
+            pcm = bytes(self._pcm[:usable])
+            del self._pcm[:usable]
+        return np.frombuffer(pcm, np.int16).astype(np.float32) / 32768.0
+
+    def close(self, timeout=5):
+        """
+        End the input, wait for ffmpeg to flush and return the last samples.
+        """
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self._reader.join(timeout=timeout)
+        return self.read()
+
+    def kill(self):
+        if self.process.poll() is None:
+            self.process.kill()
@@ -0,0 +1,144 @@
+# batching.py
+"""
+Micro-batching Whisper transcriber.
+
+Concurrent requests are collected for a short window (or until the batch is
+full), their log-mel spectrograms are padded to Whisper's 30-second input and
+stacked, and a single encoder/decoder pass transcribes the whole batch. Each
+caller blocks only until its own result is ready.
+
+Clips longer than one 30-second window cannot share a batch and are sent
+through model.transcribe on their own. Batched clips are decoded greedily at
+temperature 0, without transcribe()'s temperature fallback.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import torch
+import whisper
+from django.conf import settings
+
+from .whisper_models import transcribe_options, use_whisper_model
+
+logger = logging.getLogger(__name__)
+
+
+class BatchTranscriber:
+    """
+    Collects transcription requests and runs them through Whisper in batches.
+    """
+
+    def __init__(self, max_batch_size=8, window=0.05, model_name=None):
+        self.max_batch_size = max_batch_size
+        self.window = window
+        self.model_name = model_name
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def transcribe(self, audio):
+        """
+        Transcribe decoded audio, batched with other concurrent calls.
+
+        Args:
+        audio (numpy.ndarray): 16 kHz mono float32 samples
+
+        Returns:
+        str: Transcribed text
+        """
+        return self.submit(audio).result()
+
+    def submit(self, audio):
+        """
+        Queue decoded audio for transcription.
+
+        Returns:
+        concurrent.futures.Future: Resolves to the transcribed text
+        """
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((audio, future))
+        return future
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='whisper-batcher', daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        # Block for the first request, then gather more until the window closes or the batch is full.
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                self._process(batch)
+            except Exception as e:
+                logger.error(f"Error in batched transcription: {str(e)}", exc_info=True)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _process(self, batch):
+        with use_whisper_model(self.model_name) as model:
+            self._process_with(model, batch)
+
+    def _process_with(self, model, batch):
+        options = transcribe_options()
+
+        short = []
+        for audio, future in batch:
+            if len(audio) > whisper.audio.N_SAMPLES:
+                result = model.transcribe(audio, **options)
+                future.set_result(result["text"])
+            else:
+                short.append((audio, future))
+        if not short:
+            return
+
+        mels = torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), n_mels=model.dims.n_mels)
+            for audio, _ in short
+        ]).to(model.device)
+        decoding_options = whisper.DecodingOptions(fp16=options["fp16"], without_timestamps=True)
+        with torch.no_grad():
+            results = whisper.decode(model, mels, decoding_options)
+        for (_, future), result in zip(short, results):
+            future.set_result(result.text)
+        logger.debug(f"Transcribed a batch of {len(short)} clips")
+
+
+_transcriber = None
+_transcriber_lock = threading.Lock()
+
+
+def get_batch_transcriber():
+    """
+    The process-wide batching transcriber, configured from settings.
+
+    Returns:
+    BatchTranscriber
+    """
+    global _transcriber
+    with _transcriber_lock:
+        if _transcriber is None:
+            _transcriber = BatchTranscriber(
+                max_batch_size=settings.WHISPER_BATCH_SIZE,
+                window=settings.WHISPER_BATCH_WINDOW,
+            )
+        return _transcriber
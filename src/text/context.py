@@ -0,0 +1,240 @@
+# context.py
+"""
+Conversation context for the text model.
+
+The answer for a new turn is generated with the chat's earlier turns in the
+prompt, so users do not have to repeat themselves. The context is bounded by
+CHAT_CONTEXT_TOKENS, counted with tiktoken:
+
+- The most recent turns are added newest first until the budget is used up.
+- Turns that no longer fit are folded into a rolling summary stored on the
+  chat (Chat.context_summary, covering every turn up to
+  Chat.context_summary_upto). The summary is placed in front of the recent
+  turns and is refreshed on a background thread, so a request never waits for
+  the summary model.
+
+The prompt therefore stays at most CHAT_CONTEXT_TOKENS long however long the
+chat gets.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from image_gen.services import ServiceError, generate_summary
+from .models import Chat, History
+
+logger = logging.getLogger(__name__)
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()  # Chats whose summary is being refreshed
+
+
+def get_encoding():
+    """
+    Lazily load the tiktoken encoding.
+
+    tiktoken downloads the encoding on first use (cached under
+    TIKTOKEN_CACHE_DIR). When that is not possible, tokens are estimated from
+    the text length instead.
+
+    Returns:
+    tiktoken.Encoding, or False if unavailable
+    """
+    global _encoding
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                import tiktoken
+
+                _encoding = tiktoken.get_encoding(settings.CHAT_CONTEXT_ENCODING)
+            except Exception as e:
+                logger.warning(f"tiktoken encoding unavailable, estimating token counts: {str(e)}")
+                _encoding = False
+        return _encoding
+
+
+def count_tokens(text):
+    encoding = get_encoding()
+    if encoding:
+        return len(encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def truncate_tokens(text, max_tokens):
+    """
+    Keep the last max_tokens tokens of text.
+    """
+    encoding = get_encoding()
+    if encoding:
+        tokens = encoding.encode(text)
+        return text if len(tokens) <= max_tokens else encoding.decode(tokens[-max_tokens:])
+    return text[-max_tokens * 4:]
+
+
+def format_turn(input_text, output_text):
+    return f"User: {input_text}\nAssistant: {output_text}"
+
+
+def previous_turns(chat_id, before_id, after_id, limit):
+    """
+    Answered turns of a chat between two history ids, newest first.
+
+    Returns:
+    list: (id, input_text, output_text) tuples
+    """
+    return list(
+        History.objects.filter(chat_id=chat_id, id__lt=before_id, id__gt=after_id or 0)
+        .exclude(output_text__isnull=True).exclude(output_text='')
+        .order_by('-id').values_list('id', 'input_text', 'output_text')[:limit]
+    )
+
+
+def build_context(history):
+    """
+    Assemble the conversation before a history row within the token budget.
+
+    Args:
+    history (History): The turn being answered
+
+    Returns:
+    str: Summary and recent turns, oldest first, or '' for a new chat
+    """
+    budget = settings.CHAT_CONTEXT_TOKENS
+    if budget <= 0:
+        return ''
+
+    chat = Chat.objects.only('context_summary', 'context_summary_upto').get(pk=history.chat_id)
+    # When an earlier turn is regenerated the summary may cover later turns; leave it out then
+    use_summary = (chat.context_summary_upto or 0) < history.pk
+    parts = []
+    if use_summary and chat.context_summary:
+        summary = truncate_tokens(chat.context_summary, budget // 2)
+        parts.append(f"Summary of the earlier conversation: {summary}")
+        budget -= count_tokens(parts[0])
+
+    after_id = chat.context_summary_upto if use_summary else None
+    turns = previous_turns(history.chat_id, history.pk, after_id, settings.CHAT_CONTEXT_MAX_TURNS)
+    recent = []
+    fold_through = None
+    for turn_id, input_text, output_text in turns:
+        turn = format_turn(input_text or '', output_text)
+        tokens = count_tokens(turn)
+        if tokens > budget:
+            fold_through = turn_id
+            break
+        recent.append(turn)
+        budget -= tokens
+    else:
+        if len(turns) == settings.CHAT_CONTEXT_MAX_TURNS:
+            # Older turns exist beyond the fetched ones
+            fold_through = turns[-1][0] - 1
+
+    if fold_through is not None and use_summary:
+        schedule_summary(history.chat_id, fold_through)
+
+    return "\n\n".join(parts + recent[::-1])
+
+
+def get_executor():
+    """
+    Lazily start the summary thread.
+
+    Returns:
+    concurrent.futures.ThreadPoolExecutor
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='chat-summary')
+        return _executor
+
+
+def schedule_summary(chat_id, through_id):
+    """
+    Fold the turns up to through_id into the chat's summary in the background,
+    unless a refresh for the chat is already running.
+    """
+    if not settings.CHAT_SUMMARY_ENABLED:
+        return
+    with _executor_lock:
+        if chat_id in _pending:
+            return
+        _pending.add(chat_id)
+    get_executor().submit(refresh_summary, chat_id, through_id)
+
+
+def fold_step(chat_id, summary, upto, turns, last_id):
+    """
+    Summarise summary plus turns and store it as covering the chat through last_id.
+
+    Returns:
+    tuple: (new summary, last_id), or (summary, None) if a concurrent refresh
+        from another process advanced the summary first
+    """
+    text = "\n\n".join(([summary] if summary else []) + turns)
+    new_summary = generate_summary(text)
+    updated = Chat.objects.filter(pk=chat_id, context_summary_upto=upto).update(
+        context_summary=new_summary, context_summary_upto=last_id,
+    )
+    if not updated:
+        return summary, None
+    logger.info(f"Updated context summary of chat {chat_id} through history {last_id}")
+    return new_summary, last_id
+
+
+def refresh_summary(chat_id, through_id):
+    """
+    Fold the turns after the current summary up to through_id into it, oldest
+    first. When they do not fit in the summary model's input budget at once,
+    they are folded in several steps, each stored as soon as it is done.
+
+    Args:
+    chat_id (str): Chat code
+    through_id (int): Last history id to fold into the summary
+    """
+    try:
+        chat = Chat.objects.only('context_summary', 'context_summary_upto').get(pk=chat_id)
+        summary, upto = chat.context_summary, chat.context_summary_upto
+        if through_id <= (upto or 0):
+            return
+
+        rows = (
+            History.objects.filter(chat_id=chat_id, id__gt=upto or 0, id__lte=through_id)
+            .exclude(output_text__isnull=True).exclude(output_text='')
+            .order_by('id').values_list('id', 'input_text', 'output_text')
+        )
+        step, last_id = [], None
+        budget = settings.CHAT_SUMMARY_INPUT_TOKENS - count_tokens(summary)
+        for turn_id, input_text, output_text in rows:
+            turn = format_turn(input_text or '', output_text)
+            tokens = count_tokens(turn)
+            if tokens > budget and step:
+                summary, upto = fold_step(chat_id, summary, upto, step, last_id)
+                if upto is None:
+                    return
+                step = []
+                budget = settings.CHAT_SUMMARY_INPUT_TOKENS - count_tokens(summary)
+            if tokens > budget:
+                # A single turn longer than the budget: keep its end
+                turn = truncate_tokens(turn, max(1, budget))
+                tokens = budget
+            step.append(turn)
+            last_id = turn_id
+            budget -= tokens
+        if step:
+            fold_step(chat_id, summary, upto, step, last_id)
+    except ServiceError as e:
+        logger.error(f"Invalid response from generate_summary: {str(e)}")
+    except Exception as e:
+        logger.error(f"Error refreshing context summary of chat {chat_id}: {str(e)}", exc_info=True)
+    finally:
+        with _executor_lock:
+            _pending.discard(chat_id)
+        close_old_connections()
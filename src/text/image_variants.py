@@ -0,0 +1,118 @@
+# image_variants.py
+"""
+Downscaled WebP variants of stored chat images.
+
+Whenever a File row is saved with an output_image, a WebP copy is written for
+each entry of IMAGE_VARIANTS (name -> longer side in pixels) next to the
+original: images/generated_image.jpg gets images/generated_image.jpg_small.webp
+and images/generated_image.jpg_medium.webp. The serializers expose their URLs
+as output_image_variants, so history pages can show a small preview and only
+load the full image on demand. The IMAGE_THUMBNAIL_VARIANT variant is also
+stored in File.output_thumbnail.
+"""
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from PIL import Image
+
+from .models import File
+
+logger = logging.getLogger(__name__)
+
+
+def variant_name(name, variant):
+    """
+    Storage name of a variant of the image stored under name. The original's
+    extension is kept so images.jpg and images.png get different variants.
+    """
+    return f"{name}_{variant}.webp"
+
+
+def render_variant(image, size):
+    """
+    Returns:
+    bytes: WebP of image with its longer side at most size pixels
+    """
+    variant = image.copy()
+    variant.thumbnail((size, size))
+    if variant.mode not in ('RGB', 'RGBA'):
+        variant = variant.convert('RGB')
+    buffer = io.BytesIO()
+    variant.save(buffer, format='WEBP', quality=settings.IMAGE_VARIANT_QUALITY)
+    return buffer.getvalue()
+
+
+def create_variants(field_file):
+    """
+    Write the missing variants of a stored image.
+
+    Args:
+    field_file (FieldFile): The output_image of a File row
+    """
+    storage = field_file.storage
+    missing = {
+        variant: size for variant, size in settings.IMAGE_VARIANTS.items()
+        if not storage.exists(variant_name(field_file.name, variant))
+    }
+    if not missing:
+        return
+    with storage.open(field_file.name, 'rb') as original:
+        image = Image.open(original)
+        image.load()
+    for variant, size in missing.items():
+        target = variant_name(field_file.name, variant)
+        saved = storage.save(target, ContentFile(render_variant(image, size)))
+        if saved != target:
+            # Another process rendered the same variant meanwhile
+            storage.delete(saved)
+    logger.info(f"Created {len(missing)} image variants for {field_file.name}")
+
+
+def delete_variants(storage, name):
+    """
+    Remove the variants of the image stored under name.
+    """
+    for variant in settings.IMAGE_VARIANTS:
+        storage.delete(variant_name(name, variant))
+
+
+def variant_urls(field_file, request=None):
+    """
+    URLs of the variants of a stored image, falling back to the original.
+
+    Returns:
+    dict: Variant name -> URL, empty if there is no image
+    """
+    if not field_file:
+        return {}
+    storage = field_file.storage
+    urls = {}
+    for variant in settings.IMAGE_VARIANTS:
+        name = variant_name(field_file.name, variant)
+        url = storage.url(name) if storage.exists(name) else field_file.url
+        urls[variant] = request.build_absolute_uri(url) if request else url
+    return urls
+
+
+@receiver(post_save, sender=File)
+def create_variants_on_save(sender, instance, **kwargs):
+    if not instance.output_image:
+        return
+    try:
+        create_variants(instance.output_image)
+    except Exception as e:
+        logger.error(f"Error creating image variants for {instance.output_image.name}: {str(e)}", exc_info=True)
+        return
+
+    thumbnail_variant = settings.IMAGE_THUMBNAIL_VARIANT
+    if thumbnail_variant in settings.IMAGE_VARIANTS:
+        thumbnail = variant_name(instance.output_image.name, thumbnail_variant)
+        if instance.output_thumbnail.name != thumbnail:
+            # update() rather than save(), which would run this handler again
+            File.objects.filter(pk=instance.pk).update(output_thumbnail=thumbnail)
+            instance.output_thumbnail = thumbnail
@@ -0,0 +1,188 @@
+# jobs.py
+"""
+Background processing of chat turns.
+
+A POST to chat/ with async=true stores a ChatJob row and returns its id
+straight away. The stages from pipeline.py then run on a worker and record
+their progress on the row, which clients poll (chat/jobs/<id>/) or follow as
+server-sent events (chat/jobs/<id>/events/).
+
+With CHAT_JOB_BACKEND = 'thread' the jobs run on a thread pool inside the web
+process. With 'worker' the web process only stores them and
+`python manage.py run_chat_jobs` processes them, so web workers never hold a
+model.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.utils import timezone
+
+from .models import ChatJob, Errors, History
+from .pipeline import generate_text_stage, handle_audio_input, run_media_branches
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Lazily start the in-process worker pool.
+
+    Returns:
+    concurrent.futures.ThreadPoolExecutor
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.CHAT_JOB_WORKERS, thread_name_prefix='chat-job')
+        return _executor
+
+
+def enqueue(job):
+    """
+    Hand a saved job to the worker once the current transaction commits.
+
+    Args:
+    job (ChatJob): The queued job
+    """
+    if settings.CHAT_JOB_BACKEND == 'thread':
+        transaction.on_commit(lambda: get_executor().submit(run_job, job.pk))
+
+
+def claim(job_id):
+    """
+    Atomically move a job from queued to running.
+
+    Returns:
+    bool: True if this caller got the job
+    """
+    return ChatJob.objects.filter(pk=job_id, status=ChatJob.QUEUED).update(status=ChatJob.RUNNING) == 1
+
+
+def run_job(job_id):
+    """
+    Claim and process a job. Safe to call from any worker.
+
+    Args:
+    job_id (uuid.UUID): Primary key of the job
+    """
+    try:
+        if not claim(job_id):
+            return
+        job = ChatJob.objects.select_related('chat').get(pk=job_id)
+        process(job)
+    except Exception as e:
+        logger.error(f"Error running chat job {job_id}: {str(e)}", exc_info=True)
+    finally:
+        close_old_connections()
+
+
+def reclaim_stale():
+    """
+    Queue running jobs again whose row has not changed for CHAT_JOB_STALE_SECONDS:
+    the process running them is gone. A reclaimed job keeps its history row
+    and transcript and redoes the remaining stages.
+
+    Returns:
+    int: Number of jobs queued again
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.CHAT_JOB_STALE_SECONDS)
+    reclaimed = ChatJob.objects.filter(status=ChatJob.RUNNING, updated_at__lt=cutoff).update(
+        status=ChatJob.QUEUED, stage='', completed_stages=[], updated_at=timezone.now(),
+    )
+    if reclaimed:
+        logger.warning(f"Queued {reclaimed} stale chat jobs again")
+    return reclaimed
+
+
+def resume():
+    """
+    Called when a web process starts with CHAT_JOB_BACKEND = 'thread': reclaim
+    stale jobs and hand every queued one to the pool. Other processes doing the
+    same is harmless, run_job claims each job once.
+    """
+    if settings.CHAT_JOB_BACKEND != 'thread':
+        return
+    try:
+        reclaim_stale()
+        job_ids = list(ChatJob.objects.filter(status=ChatJob.QUEUED).order_by('added_at').values_list('pk', flat=True))
+    except DatabaseError as e:
+        # Not migrated yet
+        logger.warning(f"Could not resume chat jobs: {str(e)}")
+        return
+    for job_id in job_ids:
+        get_executor().submit(run_job, job_id)
+    if job_ids:
+        logger.info(f"Resumed {len(job_ids)} queued chat jobs")
+
+
+def start_stage(job, stage):
+    job.stage = stage
+    job.save(update_fields=['stage', 'updated_at'])
+    logger.info(f"Chat job {job.pk}: {stage}")
+
+
+def finish_stage(job, stage):
+    job.completed_stages = job.completed_stages + [stage]
+    job.save(update_fields=['completed_stages', 'updated_at'])
+
+
+def fail(job, error):
+    job.status = ChatJob.FAILED
+    job.error = error
+    job.save(update_fields=['status', 'error', 'updated_at'])
+    Errors.objects.create(chat=job.chat, error=error)
+
+
+def process(job):
+    """
+    Run the stages of a chat turn for a claimed job.
+
+    Args:
+    job (ChatJob): Job in the running state
+    """
+    try:
+        input_text = job.input_text
+        if job.input_audio:
+            start_stage(job, 'transcribe')
+            input_text = handle_audio_input(job.input_audio)
+            job.input_audio.delete(save=False)
+            job.input_text = input_text
+            job.save(update_fields=['input_audio', 'input_text', 'updated_at'])
+            if not input_text:
+                fail(job, "Failed to transcribe audio")
+                return
+            finish_stage(job, 'transcribe')
+
+        history = job.history
+        if history is None:
+            history = History.objects.create(chat=job.chat, input_text=input_text)
+            job.history = history
+            job.save(update_fields=['history', 'updated_at'])
+
+        start_stage(job, 'text')
+        output_text = generate_text_stage(history)
+        if output_text is None:
+            fail(job, "Invalid response from generate_text")
+            return
+        finish_stage(job, 'text')
+
+        start_stage(job, 'media')
+        run_media_branches(
+            history, output_text, len(output_text) > 200 and job.generate_image,
+            on_done=lambda name: finish_stage(job, name),
+        )
+
+        job.status = ChatJob.DONE
+        job.stage = ''
+        job.save(update_fields=['status', 'stage', 'updated_at'])
+        job.chat.save()  # Update the 'updated_at' field
+    except Exception as e:
+        logger.error(f"Error in chat job {job.pk}: {str(e)}", exc_info=True)
+        fail(job, str(e))
@@ -0,0 +1,228 @@
+# live_transcription.py
+"""
+Incremental speech-to-text over a WebSocket (ws/transcribe/).
+
+The client sends audio as it is recorded and gets transcripts back while it is
+still talking:
+
+    ws://host/ws/transcribe/?format=pcm&sample_rate=48000
+
+format=pcm (default) takes binary messages of 16-bit little-endian mono PCM at
+sample_rate (default 16000). format=webm or format=ogg takes the chunks of an
+Opus stream as produced by MediaRecorder; they are piped into one ffmpeg
+process per connection. model= picks a Whisper size from WHISPER_ALLOWED_MODELS.
+
+Every WHISPER_STREAM_STEP_SECONDS of new audio, the current utterance is
+transcribed and sent as {"type": "partial", "text": ...}. An utterance ends
+when the speaker has been quiet for WHISPER_STREAM_SILENCE_SECONDS, when it
+reaches WHISPER_STREAM_MAX_SECONDS (Whisper's window is 30 seconds), or when
+the client sends {"type": "stop"}. It is then transcribed once more and sent
+as {"type": "final", "text": ...}, and the next utterance starts, prompted
+with the text of the previous ones. A client can post each final transcript
+to chat/stream/ and start generating an answer before the user has finished.
+"""
+import asyncio
+import json
+import logging
+from urllib.parse import parse_qs
+
+import numpy as np
+from django.conf import settings
+
+from speech.parallel import resample
+
+from .audio_decode import SAMPLE_RATE, FFmpegStream
+from .long_form import FRAME_SECONDS, frame_energy
+from .whisper_models import transcribe_options, use_whisper_model
+
+logger = logging.getLogger(__name__)
+
+CONTAINER_FORMATS = {'webm', 'ogg'}
+PROMPT_CHARS = 200
+
+
+class LiveTranscriber:
+    """
+    Sliding-window transcription state for one connection.
+
+    feed() takes decoded 16 kHz samples and returns the events that are due.
+    """
+
+    def __init__(self, model_name=None):
+        self.model_name = model_name
+        self.utterance = np.zeros(0, dtype=np.float32)
+        self.transcribed_samples = 0
+        self.finals = []
+        self.last_partial = ''
+
+    def transcribe(self, audio):
+        prompt = ' '.join(self.finals)[-PROMPT_CHARS:] or None
+        with use_whisper_model(self.model_name) as model:
+            result = model.transcribe(
+                audio, initial_prompt=prompt, condition_on_previous_text=False,
+                temperature=0.0, **transcribe_options()
+            )
+        return result.get('text', '').strip()
+
+    def trailing_silence(self):
+        energy = frame_energy(self.utterance)
+        quiet = 0
+        for value in energy[::-1]:
+            if value >= settings.WHISPER_STREAM_SILENCE_THRESHOLD:
+                break
+            quiet += 1
+        return quiet * FRAME_SECONDS
+
+    def is_silent(self):
+        energy = frame_energy(self.utterance)
+        return not len(energy) or energy.max() < settings.WHISPER_STREAM_SILENCE_THRESHOLD
+
+    def feed(self, samples):
+        """
+        Append audio and run whatever transcription is due.
+
+        Args:
+        samples (numpy.ndarray): 16 kHz mono float32 samples
+
+        Returns:
+        list: Event dicts to send to the client
+        """
+        self.utterance = np.concatenate([self.utterance, samples])
+        max_samples = int(settings.WHISPER_STREAM_MAX_SECONDS * SAMPLE_RATE)
+        if len(self.utterance) >= max_samples:
+            return self.finish()
+        if self.transcribed_samples and self.trailing_silence() >= settings.WHISPER_STREAM_SILENCE_SECONDS:
+            return self.finish()
+        if len(self.utterance) - self.transcribed_samples < settings.WHISPER_STREAM_STEP_SECONDS * SAMPLE_RATE:
+            return []
+        self.transcribed_samples = len(self.utterance)
+        if self.is_silent():
+            return []
+        text = self.transcribe(self.utterance)
+        if text == self.last_partial:
+            return []
+        self.last_partial = text
+        return [{"type": "partial", "text": text}]
+
+    def finish(self):
+        """
+        Close the current utterance.
+
+        Returns:
+        list: The final event, if the utterance contained speech
+        """
+        utterance = self.utterance
+        self.utterance = np.zeros(0, dtype=np.float32)
+        self.transcribed_samples = 0
+        self.last_partial = ''
+        if not len(utterance) or frame_energy(utterance).max(initial=0) < settings.WHISPER_STREAM_SILENCE_THRESHOLD:
+            return []
+        text = self.transcribe(utterance)
+        if not text:
+            return []
+        self.finals.append(text)
+        return [{"type": "final", "text": text}]
+
+
+class AudioInput:
+    """
+    Turns received WebSocket messages into 16 kHz float32 samples.
+    """
+
+    def __init__(self, audio_format='pcm', sample_rate=SAMPLE_RATE):
+        if audio_format != 'pcm' and audio_format not in CONTAINER_FORMATS:
+            raise ValueError(f"Unsupported format: {audio_format}")
+        self.format = audio_format
+        self.sample_rate = sample_rate
+        self.stream = None
+        self.remainder = b''
+
+    def decode(self, data):
+        """
+        Returns:
+        numpy.ndarray: Samples that were not returned before
+        """
+        if self.format in CONTAINER_FORMATS:
+            if self.stream is None:
+                self.stream = FFmpegStream()
+            self.stream.write(data)
+            return self.stream.read()
+
+        data = self.remainder + data
+        usable = len(data) - len(data) % 2
+        self.remainder = data[usable:]
+        samples = np.frombuffer(data[:usable], np.int16).astype(np.float32) / 32768.0
+        return resample(samples, self.sample_rate, SAMPLE_RATE)
+
+    def flush(self):
+        """
+        Returns:
+        numpy.ndarray: Samples still buffered in ffmpeg at the end of the stream
+        """
+        if self.stream is None:
+            return np.zeros(0, dtype=np.float32)
+        samples = self.stream.close()
+        self.stream = None
+        return samples
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.kill()
+            self.stream = None
+
+
+async def send_json(send, data):
+    await send({"type": "websocket.send", "text": json.dumps(data)})
+
+
+async def transcribe_socket(scope, receive, send):
+    """
+    ASGI application for ws/transcribe/.
+    """
+    query = parse_qs(scope.get('query_string', b'').decode())
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+    try:
+        audio_input = AudioInput(
+            query.get('format', ['pcm'])[0],
+            int(query.get('sample_rate', [SAMPLE_RATE])[0]),
+        )
+    except ValueError as e:
+        await send({"type": "websocket.close", "code": 4400, "reason": str(e)})
+        return
+    model_name = query.get('model', [None])[0]
+    if model_name and model_name not in settings.WHISPER_ALLOWED_MODELS:
+        await send({"type": "websocket.close", "code": 4400, "reason": f"Model not allowed: {model_name}"})
+        return
+    transcriber = LiveTranscriber(model_name)
+    await send({"type": "websocket.accept"})
+
+    try:
+        while True:
+            message = await receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes"):
+                data = message["bytes"]
+                events = await asyncio.to_thread(lambda: transcriber.feed(audio_input.decode(data)))
+            elif message.get("text"):
+                command = json.loads(message["text"]).get("type")
+                if command != "stop":
+                    continue
+                events = await asyncio.to_thread(lambda: transcriber.feed(audio_input.flush()) + transcriber.finish())
+                for event in events:
+                    await send_json(send, event)
+                await send_json(send, {"type": "done", "text": " ".join(transcriber.finals)})
+                await send({"type": "websocket.close", "code": 1000})
+                break
+            else:
+                continue
+            for event in events:
+                await send_json(send, event)
+    except Exception as e:
+        logger.error(f"Error in live transcription: {str(e)}", exc_info=True)
+        await send_json(send, {"type": "error", "error": str(e)})
+        await send({"type": "websocket.close", "code": 1011})
+    finally:
+        audio_input.close()
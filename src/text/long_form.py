@@ -0,0 +1,178 @@
+# long_form.py
+"""
+Long-form transcription across a pool of worker processes.
+
+model.transcribe walks a recording 30 seconds at a time on one core, so a long
+upload is cut into chunks of about WHISPER_LONG_FORM_CHUNK_SECONDS instead.
+Each cut is placed at the quietest point near its target position, so words
+are rarely split, and every chunk is padded with a little overlap on both
+sides. The chunks are transcribed concurrently, each worker with its own
+loaded model, and stitched back together: a segment is kept only by the chunk
+whose own (unpadded) span contains its midpoint, and words repeated across a
+boundary are dropped once.
+"""
+import logging
+import re
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+from django.conf import settings
+
+from src.process_pool import SpawnPool
+from .audio_decode import SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+FRAME_SECONDS = 0.03
+SEARCH_SECONDS = 5.0
+MAX_BOUNDARY_WORDS = 8
+
+pool = SpawnPool('WHISPER_LONG_FORM_WORKERS', 'WHISPER_LONG_FORM_THREADS_PER_WORKER')
+
+
+def _transcribe_chunk(audio, model_name):
+    from .whisper_models import transcribe_options, use_whisper_model
+
+    with use_whisper_model(model_name) as model:
+        result = model.transcribe(audio, **transcribe_options())
+    return [(segment["start"], segment["end"], segment["text"]) for segment in result.get("segments", [])]
+
+
+def frame_energy(audio, sample_rate=SAMPLE_RATE):
+    """
+    RMS energy of consecutive FRAME_SECONDS frames.
+
+    Returns:
+    numpy.ndarray: One value per frame
+    """
+    frame = max(1, int(FRAME_SECONDS * sample_rate))
+    usable = len(audio) - len(audio) % frame
+    frames = audio[:usable].reshape(-1, frame)
+    return np.sqrt(np.mean(frames.astype(np.float32) ** 2, axis=1))
+
+
+def find_cuts(audio, chunk_seconds, sample_rate=SAMPLE_RATE):
+    """
+    Pick cut points about chunk_seconds apart, each at the quietest frame
+    within SEARCH_SECONDS of its target.
+
+    Args:
+    audio (numpy.ndarray): Mono samples
+    chunk_seconds (float): Target distance between cuts
+
+    Returns:
+    list: Sample offsets, starting at 0 and ending at len(audio)
+    """
+    energy = frame_energy(audio, sample_rate)
+    frame = max(1, int(FRAME_SECONDS * sample_rate))
+    chunk = int(chunk_seconds * sample_rate)
+    search = int(SEARCH_SECONDS * sample_rate)
+
+    cuts = [0]
+    target = chunk
+    while target < len(audio) - search:
+        low = max(cuts[-1] + search, target - search) // frame
+        high = min(len(energy), (target + search) // frame + 1)
+        if low >= high:
+            break
+        quietest = low + int(np.argmin(energy[low:high]))
+        cuts.append(quietest * frame + frame // 2)
+        target = cuts[-1] + chunk
+    cuts.append(len(audio))
+    return cuts
+
+
+def plan_chunks(audio, chunk_seconds, overlap_seconds, sample_rate=SAMPLE_RATE):
+    """
+    Split audio into overlapping chunks.
+
+    Returns:
+    list: (start, end, own_start, own_end) sample offsets per chunk. start/end
+        include the overlap; own_start/own_end are the cut points.
+    """
+    cuts = find_cuts(audio, chunk_seconds, sample_rate)
+    overlap = int(overlap_seconds * sample_rate)
+    return [
+        (max(0, own_start - overlap), min(len(audio), own_end + overlap), own_start, own_end)
+        for own_start, own_end in zip(cuts, cuts[1:])
+    ]
+
+
+def _words(text):
+    return [re.sub(r"[^\w']", "", word).lower() for word in text.split()]
+
+
+def drop_repeated_words(previous, text):
+    """
+    Remove leading words of text that repeat the trailing words of previous.
+
+    Returns:
+    str: text without the repeated words
+    """
+    previous_words = _words(previous)
+    words = text.split()
+    normalized = _words(text)
+    for size in range(min(MAX_BOUNDARY_WORDS, len(previous_words), len(words)), 0, -1):
+        if previous_words[-size:] == normalized[:size]:
+            return " ".join(words[size:])
+    return text
+
+
+def stitch(chunks, results, sample_rate=SAMPLE_RATE):
+    """
+    Merge per-chunk segments into one transcript.
+
+    Args:
+    chunks (list): Output of plan_chunks
+    results (list): (start, end, text) segments per chunk, relative to the chunk start
+
+    Returns:
+    dict: "text" and "segments" ({"start", "end", "text"} with absolute times in seconds)
+    """
+    segments = []
+    for (start, _, own_start, own_end), chunk_segments in zip(chunks, results):
+        offset = start / sample_rate
+        for segment_start, segment_end, text in chunk_segments:
+            segment_start += offset
+            segment_end += offset
+            midpoint = (segment_start + segment_end) / 2 * sample_rate
+            if not own_start <= midpoint < own_end:
+                continue
+            text = text.strip()
+            if segments and segment_start - segments[-1]["end"] < 1.0:
+                text = drop_repeated_words(segments[-1]["text"], text)
+            if text:
+                segments.append({"start": round(segment_start, 2), "end": round(segment_end, 2), "text": text})
+    return {"text": " ".join(segment["text"] for segment in segments), "segments": segments}
+
+
+def is_long(audio, sample_rate=SAMPLE_RATE):
+    """
+    Whether audio is long enough for the worker pool.
+    """
+    return (
+        settings.WHISPER_LONG_FORM_WORKERS > 1
+        and len(audio) >= settings.WHISPER_LONG_FORM_MIN_SECONDS * sample_rate
+    )
+
+
+def transcribe_long(audio, model_name=None):
+    """
+    Transcribe long audio in parallel chunks.
+
+    Args:
+    audio (numpy.ndarray): 16 kHz mono float32 samples
+    model_name (str): Whisper model, defaults to WHISPER_MODEL
+
+    Returns:
+    dict: "text" and "segments", as returned by stitch
+    """
+    chunks = plan_chunks(audio, settings.WHISPER_LONG_FORM_CHUNK_SECONDS, settings.WHISPER_LONG_FORM_OVERLAP_SECONDS)
+    calls = [(audio[start:end], model_name) for start, end, _, _ in chunks]
+    try:
+        results = pool.run(_transcribe_chunk, calls)
+    except BrokenProcessPool:
+        logger.error("Long-form worker pool broke, transcribing in process")
+        results = [_transcribe_chunk(*call) for call in calls]
+    logger.info(f"Transcribed {len(audio) / SAMPLE_RATE:.0f}s of audio in {len(chunks)} parallel chunks")
+    return stitch(chunks, results)
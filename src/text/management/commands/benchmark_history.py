@@ -0,0 +1,112 @@
+"""
+Measure history-page latency on a large History table.
+
+    python manage.py benchmark_history --rows 1000000 --chats 1000
+    DB_ENGINE=postgres python manage.py benchmark_history --keep
+
+Seeds --rows History rows (each with one File) spread over --chats chats,
+then times the chat GET endpoint: the first page and pages deep into one chat
+reached by following the cursor, plus the chat list. The query plan of the
+page query is printed so a missing index shows up as a table scan. Seeded rows
+are removed afterwards unless --keep is given; a later run reuses kept rows.
+"""
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings
+
+from text.models import Chat, File, History
+
+TITLE = 'benchmark_history'
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = "Time history pages of the chat API with a large History table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000, help="History rows to seed")
+        parser.add_argument('--chats', type=int, default=1000, help="Chats to spread them over")
+        parser.add_argument('--per-page', type=int, default=20)
+        parser.add_argument('--pages', type=int, default=20, help="Pages to follow in one chat")
+        parser.add_argument('--repeat', type=int, default=50, help="Timed requests per measurement")
+        parser.add_argument('--keep', action='store_true', help="Keep the seeded rows")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Database: {connection.vendor}")
+        chats = self.seed(options['rows'], options['chats'])
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            self.measure(chats[0], options)
+
+        if not options['keep']:
+            self.stdout.write("Removing seeded rows...")
+            Chat.objects.filter(title=TITLE).delete()
+
+    def measure(self, chat, options):
+        client = Client()
+        url = f"/api/text/chat/?chat_code={chat}&per_page={options['per_page']}"
+
+        self.report("First history page", self.time(client, [url] * options['repeat']))
+
+        deep, next_url = [], url
+        for _ in range(options['pages']):
+            if not next_url:
+                break
+            deep.append(next_url)
+            next_url = client.get(next_url).json()['next']
+        self.report(f"History pages 1-{len(deep)}", self.time(client, deep * max(1, options['repeat'] // len(deep))))
+
+        list_url = f"/api/text/querychat/list_chats/?per_page={options['per_page']}"
+        self.report("Chat list page", self.time(client, [list_url] * options['repeat']))
+
+        self.stdout.write("\nPlan of the history page query:")
+        page_query = History.objects.filter(chat_id=chat).order_by('-added_at', '-id')[:options['per_page']]
+        self.stdout.write(page_query.explain())
+
+    def seed(self, rows, chat_count):
+        chats = list(Chat.objects.filter(title=TITLE).values_list('code', flat=True))
+        existing = History.objects.filter(chat__title=TITLE).count()
+        if len(chats) >= chat_count and existing >= rows:
+            self.stdout.write(f"Reusing {existing} seeded History rows in {len(chats)} chats")
+            return chats
+
+        Chat.objects.filter(title=TITLE).delete()
+        self.stdout.write(f"Seeding {rows} History rows in {chat_count} chats...")
+        start = time.perf_counter()
+        chats = [Chat.objects.create(title=TITLE) for _ in range(chat_count)]
+
+        for offset in range(0, rows, BATCH_SIZE):
+            with transaction.atomic():
+                histories = History.objects.bulk_create([
+                    History(chat=chats[i % chat_count], input_text=f"question {i}", output_text=f"answer {i}")
+                    for i in range(offset, min(offset + BATCH_SIZE, rows))
+                ])
+                if not all(history.pk for history in histories):
+                    # Backends that do not return primary keys from bulk inserts
+                    histories = History.objects.filter(chat__title=TITLE).order_by('-id')[:len(histories)]
+                File.objects.bulk_create([
+                    File(history=history, output_audio=f"audio/benchmark_{history.pk}.ogg")
+                    for history in histories
+                ])
+        self.stdout.write(f"Seeded in {time.perf_counter() - start:.1f}s")
+        return [chat.code for chat in chats]
+
+    def time(self, client, urls):
+        timings = []
+        for url in urls:
+            start = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                self.stderr.write(f"{url}: {response.status_code}")
+        return timings
+
+    def report(self, label, timings):
+        timings = sorted(timings)
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            f"{label}: p50 {statistics.median(timings):.1f} ms, p95 {p95:.1f} ms over {len(timings)} requests"
+        )
@@ -0,0 +1,129 @@
+"""
+Compare accuracy and speed of the float32 and int8 inference modes.
+
+    python manage.py benchmark_quantization
+    python manage.py benchmark_quantization --clips path/to/clips --whisper-dtypes float32 int8
+
+Whisper is scored by word error rate (WER) and real-time factor (RTF, processing
+time divided by audio duration) on a clip set. Without --clips the set is the
+bundled SAMPLE_SENTENCES, rendered once with the float32 TTS model. A --clips
+directory holds audio files plus a transcripts.json mapping file names to
+their reference text. TTS is scored by RTF on the same sentences.
+"""
+import json
+import os
+import re
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from speech.parallel import resample
+from speech.tts_models import TTSModelPool
+from src.quantization import model_size_bytes
+from text.audio_decode import SAMPLE_RATE, decode_audio
+from text.whisper_models import WhisperModelRegistry, transcribe_options
+
+SAMPLE_SENTENCES = [
+    "The quick brown fox jumps over the lazy dog.",
+    "Nairobi is the capital and largest city of Kenya.",
+    "Please send the report to the finance team before Friday.",
+    "Whisper converts speech into text in many different languages.",
+    "The weather today is sunny with a light breeze from the east.",
+    "She bought three apples, two oranges and a loaf of bread.",
+    "Our next meeting has been moved to half past ten tomorrow morning.",
+    "Turn left at the second traffic light and the station is on your right.",
+]
+
+
+def normalize_words(text):
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_errors(reference, hypothesis):
+    """
+    Word-level edit distance between two transcripts.
+
+    Returns:
+    tuple: (errors, number of reference words)
+    """
+    ref, hyp = normalize_words(reference), normalize_words(hypothesis)
+    row = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        previous, row[0] = row[0], i
+        for j, hyp_word in enumerate(hyp, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (ref_word != hyp_word))
+    return row[-1], len(ref)
+
+
+class Command(BaseCommand):
+    help = "Report WER and real-time factor of Whisper and TTS in float32 and int8 modes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clips', default=None, help="Directory with audio clips and transcripts.json")
+        parser.add_argument('--whisper-model', default=None, help="Whisper model name")
+        parser.add_argument('--whisper-dtypes', nargs='+', default=['float32', 'int8'])
+        parser.add_argument('--tts-model', default=None, help="Coqui model name")
+        parser.add_argument('--tts-dtypes', nargs='+', default=['float32', 'int8'])
+        parser.add_argument('--skip-tts', action='store_true', help="Only benchmark Whisper")
+
+    def handle(self, *args, **options):
+        clips = self.load_clips(options)
+        duration = sum(len(audio) for audio, _ in clips) / SAMPLE_RATE
+        self.stdout.write(f"{len(clips)} clips, {duration:.1f}s of audio")
+
+        for dtype in options['whisper_dtypes']:
+            registry = WhisperModelRegistry()
+            with registry.use(options['whisper_model'], 'cpu', dtype) as model:
+                model.transcribe(clips[0][0], **transcribe_options(dtype))  # warm-up
+                errors = words = 0
+                started = time.perf_counter()
+                for audio, reference in clips:
+                    result = model.transcribe(audio, **transcribe_options(dtype))
+                    clip_errors, clip_words = word_errors(reference, result.get('text', ''))
+                    errors += clip_errors
+                    words += clip_words
+                elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"whisper {dtype:<8} WER {errors / max(words, 1):6.2%}  RTF {elapsed / duration:6.3f}  "
+                f"size {model_size_bytes(model) / 1024 / 1024:7.1f} MB"
+            )
+
+        if options['skip_tts']:
+            return
+        for dtype in options['tts_dtypes']:
+            tts = TTSModelPool(dtype=dtype).get(options['tts_model'])
+            tts.tts(text=SAMPLE_SENTENCES[0])  # warm-up
+            synthesis_time = audio_time = 0.0
+            for sentence in SAMPLE_SENTENCES:
+                started = time.perf_counter()
+                samples = tts.tts(text=sentence)
+                synthesis_time += time.perf_counter() - started
+                audio_time += len(samples) / tts.synthesizer.output_sample_rate
+            self.stdout.write(
+                f"tts     {dtype:<8} RTF {synthesis_time / audio_time:6.3f}  "
+                f"size {model_size_bytes(tts) / 1024 / 1024:7.1f} MB"
+            )
+
+    def load_clips(self, options):
+        """
+        Returns:
+        list: (16 kHz samples, reference text) pairs
+        """
+        if options['clips']:
+            manifest = os.path.join(options['clips'], 'transcripts.json')
+            if not os.path.exists(manifest):
+                raise CommandError(f"{manifest} not found")
+            with open(manifest) as f:
+                transcripts = json.load(f)
+            return [
+                (decode_audio(os.path.join(options['clips'], name)), text)
+                for name, text in transcripts.items()
+            ]
+
+        tts = TTSModelPool(dtype='float32').get(options['tts_model'])
+        rate = tts.synthesizer.output_sample_rate
+        return [
+            (resample(np.asarray(tts.tts(text=sentence), dtype=np.float32), rate, SAMPLE_RATE), sentence)
+            for sentence in SAMPLE_SENTENCES
+        ]
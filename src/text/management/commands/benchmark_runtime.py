@@ -0,0 +1,112 @@
+"""
+Measure throughput of transcribe_audio and text_to_speech for different
+worker x thread layouts.
+
+    python manage.py benchmark_runtime --layouts 1x8 2x4 4x2 8x1 --requests 8
+    python manage.py benchmark_runtime --affinity auto --audio sample.wav
+
+Each layout starts WORKERS spawned processes configured through
+src.runtime.configure with THREADS intra-op threads, the same way web workers
+are configured, and keeps all of them busy with requests.
+"""
+import multiprocessing
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from django.core.management.base import BaseCommand, CommandError
+
+SAMPLE_TEXT = "The quick brown fox jumps over the lazy dog while the city wakes up around it."
+
+_clip = None
+
+
+def _init_worker(threads, affinity, workers, audio_path):
+    import django
+
+    django.setup()
+    from django.conf import settings
+
+    from src import runtime
+
+    runtime.configure(num_threads=threads, affinity=affinity, workers=workers)
+    # Measure the models themselves: no cached audio and no nested process pools.
+    settings.TTS_CACHE_ENABLED = False
+    settings.TTS_PARALLEL_WORKERS = 0
+    settings.WHISPER_LONG_FORM_WORKERS = 0
+
+    global _clip
+    if audio_path:
+        from text.audio_decode import decode_audio
+
+        _clip = decode_audio(audio_path)
+    else:
+        import numpy as np
+
+        from speech.parallel import resample
+        from speech.tts_models import use_tts
+        from text.audio_decode import SAMPLE_RATE
+
+        with use_tts() as tts:
+            samples = np.asarray(tts.tts(text=SAMPLE_TEXT), dtype=np.float32)
+            rate = tts.synthesizer.output_sample_rate
+        _clip = resample(samples, rate, SAMPLE_RATE)
+    # Warm both models up so the first timed request does not pay for loading.
+    _run('transcribe')
+    _run('tts')
+
+
+def _run(kind):
+    from speech.services import text_to_speech
+    from text.views import transcribe_audio
+
+    started = time.perf_counter()
+    if kind == 'transcribe':
+        transcribe_audio(_clip)
+    else:
+        text_to_speech(SAMPLE_TEXT)
+    return time.perf_counter() - started
+
+
+def parse_layout(layout):
+    try:
+        workers, threads = layout.lower().split('x')
+        return int(workers), int(threads)
+    except ValueError:
+        raise CommandError(f"Invalid layout {layout!r}, expected WORKERSxTHREADS")
+
+
+class Command(BaseCommand):
+    help = "Report requests/sec of transcription and TTS for worker x thread layouts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--layouts', nargs='+', default=['1x4', '2x2', '4x1'], help="WORKERSxTHREADS")
+        parser.add_argument('--requests', type=int, default=4, help="Requests per worker and kind")
+        parser.add_argument('--affinity', default='', help="TORCH_CPU_AFFINITY for the workers, e.g. auto")
+        parser.add_argument('--audio', default=None, help="Clip to transcribe, defaults to synthesised speech")
+
+    def handle(self, *args, **options):
+        for layout in options['layouts']:
+            workers, threads = parse_layout(layout)
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(threads, options['affinity'], workers, options['audio']),
+            )
+            try:
+                # Start every worker (and let it warm up) before timing.
+                wait([executor.submit(time.sleep, 0.1) for _ in range(workers * 2)])
+                for kind in ('transcribe', 'tts'):
+                    count = workers * options['requests']
+                    started = time.perf_counter()
+                    latencies = list(executor.map(_run, [kind] * count))
+                    elapsed = time.perf_counter() - started
+                    latencies.sort()
+                    self.stdout.write(
+                        f"{workers}x{threads:<3} {kind:<10} {count / elapsed:6.2f} req/s  "
+                        f"p50 {statistics.median(latencies):6.3f}s  "
+                        f"p95 {latencies[int(0.95 * (len(latencies) - 1))]:6.3f}s"
+                    )
+            finally:
+                executor.shutdown()
@@ -0,0 +1,71 @@
+"""
+Measure transcription throughput with and without micro-batching.
+
+    python manage.py benchmark_whisper_batching --audio sample.wav --clients 16
+
+The baseline sends the same concurrent callers through the model's inference
+lock, one clip per model call, as unbatched requests are served; the batched
+runs share the model through BatchTranscriber.
+"""
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from text.audio_decode import SAMPLE_RATE, decode_audio
+from text.batching import BatchTranscriber
+from text.whisper_models import transcribe_options, use_whisper_model
+
+
+class Command(BaseCommand):
+    help = "Compare clips/sec of unbatched, serialised Whisper transcription against micro-batched transcription."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--audio', nargs='+', required=True, help="Audio files to cut into clips")
+        parser.add_argument('--clip-seconds', type=float, default=5.0, help="Length of each clip")
+        parser.add_argument('--clients', type=int, default=16, help="Concurrent callers")
+        parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 4, 8, 16])
+        parser.add_argument('--windows', type=float, nargs='+', default=[0.02, 0.05, 0.1], help="Batch windows in seconds")
+        parser.add_argument('--model', default=None, help="Whisper model name")
+
+    def handle(self, *args, **options):
+        clip_size = int(options['clip_seconds'] * SAMPLE_RATE)
+        clips = []
+        for path in options['audio']:
+            audio = decode_audio(path)
+            clips.extend(audio[i:i + clip_size] for i in range(0, len(audio) - clip_size + 1, clip_size))
+        if not clips:
+            raise CommandError("The audio files are shorter than one clip")
+
+        with use_whisper_model(options['model']) as model:
+            model.transcribe(clips[0], **transcribe_options())  # warm-up
+
+        def unbatched(clip):
+            # One clip at a time: concurrent decodes on one model would corrupt each other.
+            with use_whisper_model(options['model']) as model:
+                return model.transcribe(clip, **transcribe_options())["text"]
+
+        self.report("unbatched (serialised)", unbatched, clips, options['clients'])
+
+        for batch_size in options['batch_sizes']:
+            for window in options['windows']:
+                transcriber = BatchTranscriber(max_batch_size=batch_size, window=window, model_name=options['model'])
+                self.report(f"batch={batch_size:<3} window={window:.3f}s", transcriber.transcribe, clips, options['clients'])
+
+    def report(self, label, transcribe, clips, clients):
+        latencies = []
+
+        def timed(clip):
+            started = time.perf_counter()
+            transcribe(clip)
+            latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            list(executor.map(timed, clips))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{label:<28} {len(clips) / elapsed:7.2f} clips/s "
+            f"latency median {statistics.median(latencies):6.3f}s max {max(latencies):6.3f}s"
+        )
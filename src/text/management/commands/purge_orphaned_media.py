@@ -0,0 +1,37 @@
+"""
+Find and remove media files that no database row references.
+
+    python manage.py purge_orphaned_media --dry-run
+    python manage.py purge_orphaned_media --min-age 3600
+
+Chat deletion removes media in the background after the rows are gone; files
+left behind by a crash in between, or by requests that failed before saving
+their row, are picked up here, and so is synthesised speech in the TTS cache
+that no row uses any more. Files newer than --min-age seconds are skipped so
+media of requests still in flight is kept.
+"""
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from text.purge import find_orphans
+
+
+class Command(BaseCommand):
+    help = "Delete files under MEDIA_ROOT that are not referenced by any File or ChatJob row."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age', type=float, default=3600, help="Skip files modified within this many seconds")
+        parser.add_argument('--dry-run', action='store_true', help="List orphans without deleting them")
+
+    def handle(self, *args, **options):
+        count = total = 0
+        for name, size in find_orphans(options['min_age']):
+            count += 1
+            total += size
+            if options['dry_run']:
+                self.stdout.write(name)
+            else:
+                default_storage.delete(name)
+
+        prefix = "Found" if options['dry_run'] else "Removed"
+        self.stdout.write(f"{prefix} {count} orphaned files, {total / 1024 / 1024:.1f} MB")
@@ -0,0 +1,78 @@
+"""
+Re-encode stored chat audio with the current storage codec.
+
+    python manage.py reencode_audio --dry-run
+    python manage.py reencode_audio --codec opus --bitrate 32k
+
+Every File.output_audio that is not already in the target format gets a new,
+encoded copy under audio/, or the shared encoded copy of a TTS cache blob. The
+old file is deleted, or released when it is a shared TTS cache blob. The command reports the bytes saved.
+"""
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+
+from speech.audio_cache import tts_cache
+from speech.audio_codec import CODECS, decode_to_wav, encode_audio, is_wav
+from text.models import File
+
+
+class Command(BaseCommand):
+    help = "Re-encode File.output_audio with AUDIO_STORAGE_CODEC and report the bytes saved."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--codec', default=None, help="Target codec, defaults to AUDIO_STORAGE_CODEC")
+        parser.add_argument('--bitrate', default=None, help="Target bitrate, defaults to AUDIO_STORAGE_BITRATE")
+        parser.add_argument('--dry-run', action='store_true', help="Encode and report without saving")
+
+    def handle(self, *args, **options):
+        codec = options['codec'] or settings.AUDIO_STORAGE_CODEC
+        if codec not in CODECS:
+            raise CommandError(f"Unknown codec {codec}, choose from {', '.join(CODECS)}")
+        extension = CODECS[codec][1]
+
+        converted = failed = before_total = after_total = 0
+        files = File.objects.exclude(output_audio='').exclude(output_audio__isnull=True).iterator()
+        for file in files:
+            name = file.output_audio.name
+            if os.path.splitext(name)[1].lower() == extension:
+                continue
+            try:
+                with file.output_audio.open('rb') as stored:
+                    data = stored.read()
+                wav = data if is_wav(name) else decode_to_wav(data)
+                audio = encode_audio(wav, codec, options['bitrate'])
+            except (OSError, RuntimeError) as e:
+                failed += 1
+                self.stderr.write(f"{name}: {e}")
+                continue
+
+            before_total += len(data)
+            after_total += len(audio.content)
+            converted += 1
+            if options['dry_run']:
+                continue
+
+            if tts_cache.is_cache_name(name) and is_wav(name):
+                # Rows sharing the blob share its encoded copy too
+                file.output_audio.name = tts_cache.encoded(name, wav, codec, options['bitrate'])
+                file.save()
+                tts_cache.release(name)
+                continue
+            new_name = os.path.splitext(os.path.basename(name))[0] + audio.extension
+            file.output_audio.save(new_name, ContentFile(audio.content), save=True)
+            if tts_cache.is_cache_name(name):
+                tts_cache.release(name)
+            else:
+                file.output_audio.storage.delete(name)
+
+        saved = before_total - after_total
+        ratio = after_total / before_total if before_total else 0
+        prefix = "Would re-encode" if options['dry_run'] else "Re-encoded"
+        self.stdout.write(
+            f"{prefix} {converted} files to {codec}: {before_total / 1024 / 1024:.1f} MB -> "
+            f"{after_total / 1024 / 1024:.1f} MB, {saved / 1024 / 1024:.1f} MB saved ({ratio:.0%} of original)"
+            + (f", {failed} failed" if failed else "")
+        )
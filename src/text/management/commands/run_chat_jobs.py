@@ -0,0 +1,40 @@
+"""
+Process queued chat jobs outside the web server.
+
+    CHAT_JOB_BACKEND=worker python manage.py run_chat_jobs --workers 2
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from text.jobs import reclaim_stale, run_job
+from text.models import ChatJob
+
+
+class Command(BaseCommand):
+    help = "Run queued chat jobs. Several workers (or several copies of this command) can share one database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help="Jobs processed concurrently")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds between checks for new jobs")
+        parser.add_argument('--once', action='store_true', help="Drain the queue and exit")
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='chat-job') as executor:
+            while True:
+                # Jobs left running by a worker that died are queued again.
+                reclaim_stale()
+                job_ids = list(
+                    ChatJob.objects.filter(status=ChatJob.QUEUED)
+                    .order_by('added_at')
+                    .values_list('pk', flat=True)[:workers]
+                )
+                if job_ids:
+                    # run_job claims each job atomically, so other workers skip it.
+                    list(executor.map(run_job, job_ids))
+                    continue
+                if options['once']:
+                    return
+                time.sleep(options['poll_interval'])
@@ -7,9 +7,16 @@ class Chat(models.Model):
     title = models.CharField(max_length=255,null=True,)
     added_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Rolling summary of the turns up to history id context_summary_upto, see context.py
+    context_summary = models.TextField(blank=True, default='')
+    context_summary_upto = models.BigIntegerField(null=True, blank=True)
 
     class Meta:
         db_table = 'text_chat'
+        indexes = [
+            # Chat list, newest first (cursor pagination on updated_at)
+            models.Index(fields=['-updated_at', '-code'], name='text_chat_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} id: {self.code}"
@@ -26,6 +33,12 @@ class History(models.Model):
     added_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # History pages of one chat (cursor pagination on added_at)
+            models.Index(fields=['chat', '-added_at', '-id'], name='text_history_chat_added_idx'),
+        ]
+
     def __str__(self):
         return f"History entry for Chat {self.chat.code}"
 
@@ -33,14 +46,56 @@ class File(models.Model):
     history = models.ForeignKey(History, related_name='files', on_delete=models.CASCADE)
     output_audio = models.FileField(upload_to='audio/', null=True, blank=True)
     output_image = models.ImageField(upload_to='images/', null=True, blank=True)
+    output_thumbnail = models.ImageField(upload_to='images/thumbnails/', null=True, blank=True)
     added_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Files of the history rows on a page, prefetched in id order
+            models.Index(fields=['history', 'id'], name='text_file_history_id_idx'),
+        ]
+
 class Errors(models.Model):
     chat = models.ForeignKey(Chat, related_name='errors', on_delete=models.CASCADE)  # Changed from 'code' to 'chat'
     error = models.TextField(null=True, blank=True)
     added_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Errors of one chat, newest first
+            models.Index(fields=['chat', '-updated_at'], name='text_errors_chat_updated_idx'),
+        ]
+
     def __str__(self):
         return f"Error for Chat {self.chat.code}: {self.error[:50]}"
+
+class ChatJob(models.Model):
+    """A chat turn processed in the background, see jobs.py."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    chat = models.ForeignKey(Chat, related_name='jobs', on_delete=models.CASCADE)
+    history = models.ForeignKey(History, related_name='jobs', null=True, blank=True, on_delete=models.SET_NULL)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    stage = models.CharField(max_length=50, blank=True, default='')
+    completed_stages = models.JSONField(default=list, blank=True)
+    input_text = models.TextField(null=True, blank=True)
+    input_audio = models.FileField(upload_to='job_audio/', null=True, blank=True)  # Kept until transcribed
+    generate_image = models.BooleanField(default=False)
+    error = models.TextField(null=True, blank=True)
+    added_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Job {self.id} for Chat {self.chat_id}: {self.status}"
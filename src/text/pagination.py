@@ -0,0 +1,26 @@
+# pagination.py
+"""
+Cursor (keyset) pagination for the chat read paths.
+
+Page numbers make the database count and skip rows on every request and shift
+when new messages arrive. A cursor encodes the position in the ordering
+(updated_at for chats, added_at for history rows), so every page is a single
+indexed range query, however far back the client scrolls.
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class ChatCursorPagination(CursorPagination):
+    """Chats, most recently updated first."""
+    ordering = ('-updated_at', '-code')
+    page_size = 20
+    page_size_query_param = 'per_page'
+    max_page_size = 100
+
+
+class HistoryCursorPagination(CursorPagination):
+    """History rows of one chat, newest first."""
+    ordering = ('-added_at', '-id')
+    page_size = 10
+    page_size_query_param = 'per_page'
+    max_page_size = 100
@@ -0,0 +1,354 @@
+# pipeline.py
+"""
+Stages of a chat turn: transcription, text generation, image generation and
+speech synthesis.
+
+create_chat runs them inside the request; the job queue in jobs.py runs the
+same stages on a background worker. Image and audio generation only depend on
+the generated text, so run_media_branches runs them concurrently. The stages
+call the in-process services (image_gen.services, speech.services), so text
+and media are passed around as str and bytes, never as base64 JSON.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+
+from image_gen.services import ServiceError, generate_image, generate_summary, generate_text
+from image_gen.views import generate_text_stream
+from speech.audio_cache import tts_cache
+from speech.audio_codec import encode_audio
+from speech.services import text_to_speech
+
+from .audio_decode import decode_audio
+from .batching import get_batch_transcriber
+from .context import build_context
+from .image_variants import delete_variants
+from .long_form import is_long, transcribe_long
+from .models import File
+from .whisper_models import transcribe_options, use_whisper_model
+
+logger = logging.getLogger(__name__)
+
+_branch_executor = None
+_branch_executor_lock = threading.Lock()
+
+
+def transcribe_samples(audio):
+    """
+    Transcribe decoded audio, through the batching transcriber when WHISPER_BATCHING is on.
+
+    Args:
+    audio (numpy.ndarray): 16 kHz mono float32 samples
+
+    Returns:
+    str: Transcribed text
+    """
+    if is_long(audio):
+        return transcribe_long(audio)['text']
+    if settings.WHISPER_BATCHING:
+        return get_batch_transcriber().transcribe(audio)
+    with use_whisper_model() as model:
+        result = model.transcribe(audio, **transcribe_options())
+    return result.get('text', '')
+
+
+def transcribe_segments(audio):
+    """
+    Transcribe decoded audio with segment timestamps.
+
+    Long audio is split across the long-form worker pool (see long_form.py).
+
+    Returns:
+    dict: "text" and "segments" ({"start", "end", "text"}, times in seconds)
+    """
+    if is_long(audio):
+        return transcribe_long(audio)
+    with use_whisper_model() as model:
+        result = model.transcribe(audio, **transcribe_options())
+    segments = [
+        {"start": round(segment["start"], 2), "end": round(segment["end"], 2), "text": segment["text"].strip()}
+        for segment in result.get('segments', [])
+    ]
+    return {"text": result.get('text', ''), "segments": segments}
+
+
+def handle_audio_input(audio_file):
+    """
+    Transcribe an uploaded audio file.
+
+    Args:
+    audio_file (UploadedFile or File): The audio upload
+
+    Returns:
+    str: Transcribed text, or None if transcription failed
+    """
+    try:
+        file_extension = os.path.splitext(audio_file.name)[1].lower()
+        audio = decode_audio(audio_file, suffix=file_extension)
+        return transcribe_samples(audio)
+
+    except Exception as e:
+        logger.error(f"Error in handle_audio_input: {str(e)}", exc_info=True)
+        return None
+
+
+def get_first_four_words(sentence):
+    words = sentence.split()
+    first_four_words = words[:4]
+    return ' '.join(first_four_words)
+
+
+def generate_text_stage(history):
+    """
+    Generate the answer for a history row and save it, naming the chat if needed.
+
+    Args:
+    history (History): Row with input_text set
+
+    Returns:
+    str: The generated text, or None if generation failed
+    """
+    logger.info("Generating text response...")
+    try:
+        output_text = generate_text(history.input_text, build_context(history))
+    except ServiceError as e:
+        logger.error(f"Invalid response from generate_text: {str(e)}")
+        return None
+    logger.info(f"Generated text response: {output_text[:50]}...")  # Log first 50 chars
+    save_output_text(history, output_text)
+    return output_text
+
+
+def save_output_text(history, output_text):
+    """
+    Save the generated answer on its history row and name the chat if needed.
+    """
+    # saving the title
+    chat = history.chat
+    chat.refresh_from_db()
+    if chat.title == 'New chat':
+        chat.title = get_first_four_words(output_text)
+        chat.save()
+        logger.info(f"Set chat title: {chat.title}")
+
+    history.output_text = output_text
+    history.save()
+
+    if not chat.title:
+        chat.title = ' '.join(output_text.split()[:3])
+        chat.save()
+        logger.info(f"Set chat title: {chat.title}")
+
+
+def stream_text_stage(history):
+    """
+    Generate the answer for a history row token by token.
+
+    Yields cleaned text pieces as the model produces them and saves the full
+    answer with save_output_text once the stream ends.
+
+    Returns:
+    generator: Cleaned text pieces
+    """
+    logger.info("Streaming text response...")
+    pieces, cleaner = generate_text_stream(history.input_text, build_context(history))
+    yield from pieces
+    logger.info(f"Generated text response: {cleaner.text[:50]}...")  # Log first 50 chars
+    save_output_text(history, cleaner.text)
+
+
+def image_stage(history, output_text):
+    """
+    Summarise the answer, generate an image from the summary and attach it to the history row.
+
+    Returns:
+    File: The row holding the image, or None if no image was produced
+    """
+    logger.info("Generating image...")
+    try:
+        summary = generate_summary(output_text)
+    except ServiceError as e:
+        logger.warning(f"Invalid response from generate_summary: {str(e)}")
+        return None
+    if not summary:
+        logger.warning("No summary generated for image")
+        return None
+
+    image = generate_image(summary)
+    if not image.content:
+        logger.warning("No image data from generate_image")
+        return None
+
+    file = File.objects.create(history=history)
+    save_image(file, image, 'generated_image')
+    logger.info("Image generated and saved successfully")
+    return file
+
+
+def audio_stage(history, output_text):
+    """
+    Synthesise the answer and attach the audio to the history row.
+
+    Returns:
+    File: The row holding the audio, or None if no audio was produced
+    """
+    logger.info("Generating audio response...")
+    try:
+        speech = text_to_speech(output_text)
+    except Exception as e:
+        logger.warning(f"Invalid response from text_to_speech: {str(e)}")
+        return None
+    if not speech.content:
+        logger.warning("No audio data from text_to_speech")
+        return None
+
+    try:
+        file = File.objects.create(history=history)
+        file_name = f'generated_audio_{int(time.time())}.wav'  # Unique filename
+        save_audio(file, speech, file_name)
+        logger.info(f"Audio generated and saved successfully: {file.output_audio.name}")
+        return file
+    except Exception as e:
+        logger.error(f"Error saving audio file: {str(e)}")
+        return None
+
+
+def get_branch_executor():
+    """
+    Lazily start the thread pool shared by the image and audio branches.
+
+    Returns:
+    concurrent.futures.ThreadPoolExecutor
+    """
+    global _branch_executor
+    with _branch_executor_lock:
+        if _branch_executor is None:
+            _branch_executor = ThreadPoolExecutor(max_workers=settings.CHAT_BRANCH_WORKERS, thread_name_prefix='chat-branch')
+        return _branch_executor
+
+
+def _run_branch(stage, history, output_text):
+    try:
+        return stage(history, output_text)
+    except Exception as e:
+        logger.error(f"Error in {stage.__name__}: {str(e)}", exc_info=True)
+        return None
+    finally:
+        close_old_connections()
+
+
+def run_media_branches(history, output_text, generate_image_flag, on_done=None):
+    """
+    Generate the image and the audio for an answer concurrently.
+
+    Each branch saves its File row as soon as it finishes. A branch that runs
+    past its timeout (CHAT_IMAGE_TIMEOUT / CHAT_AUDIO_TIMEOUT) is no longer
+    waited for; it keeps running and still saves its result when it is done.
+
+    Args:
+    history (History): Row the files belong to
+    output_text (str): Generated answer
+    generate_image_flag (bool): Whether to run the image branch
+    on_done (callable): Called with the branch name in the calling thread as each branch finishes
+
+    Returns:
+    dict: Branch name -> File, or None if the branch failed or timed out
+    """
+    branches = {'audio': (audio_stage, settings.CHAT_AUDIO_TIMEOUT)}
+    if generate_image_flag:
+        branches['image'] = (image_stage, settings.CHAT_IMAGE_TIMEOUT)
+
+    executor = get_branch_executor()
+    started = time.monotonic()
+    futures = {}
+    deadlines = {}
+    for name, (stage, timeout) in branches.items():
+        future = executor.submit(_run_branch, stage, history, output_text)
+        futures[future] = name
+        deadlines[future] = started + timeout
+
+    results = {}
+    pending = set(futures)
+    while pending:
+        timeout = max(0, min(deadlines[future] for future in pending) - time.monotonic())
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            name = futures[future]
+            results[name] = future.result()
+            if on_done:
+                on_done(name)
+        now = time.monotonic()
+        for future in [future for future in pending if deadlines[future] <= now]:
+            name = futures[future]
+            logger.warning(f"{name} generation timed out after {branches[name][1]}s, continuing without it")
+            results[name] = None
+            pending.discard(future)
+    return results
+
+
+def save_audio(file, speech, file_name):
+    """
+    Store text_to_speech output on a File row.
+
+    Audio from the TTS cache is not copied: the row points at the shared blob
+    encoded with AUDIO_STORAGE_CODEC. Other audio is encoded and written to a
+    new file under audio/. If encoding fails the WAV is stored instead.
+
+    Args:
+    file (File): Row to update
+    speech (SynthesizedSpeech): Result of speech.services.text_to_speech
+    file_name (str): Name used when a new copy has to be written; the
+        extension is replaced with the codec's
+    """
+    previous = file.output_audio.name if file.output_audio else None
+    if speech.cache_name:
+        try:
+            file.output_audio.name = tts_cache.encoded(speech.cache_name, speech.content)
+        except RuntimeError as e:
+            logger.error(f"Error encoding audio, storing WAV: {str(e)}")
+            file.output_audio.name = speech.cache_name
+        file.save()
+    else:
+        try:
+            audio = encode_audio(speech.content)
+        except RuntimeError as e:
+            logger.error(f"Error encoding audio, storing WAV: {str(e)}")
+            audio = encode_audio(speech.content, 'wav')
+        file_name = os.path.splitext(file_name)[0] + audio.extension
+        file.output_audio.save(file_name, ContentFile(audio.content), save=True)
+
+    if previous and previous != file.output_audio.name:
+        if tts_cache.is_cache_name(previous):
+            tts_cache.release(previous)
+        else:
+            file.output_audio.storage.delete(previous)
+
+
+def save_image(file, image, name):
+    """
+    Store generate_image output on a File row. Its variants, including the
+    thumbnail, are written when the row is saved (see image_variants.py).
+
+    Args:
+    file (File): Row to update
+    image (EncodedImage): Result of image_gen.services.generate_image
+    name (str): File name without extension
+    """
+    previous = file.output_image.name if file.output_image else None
+    previous_thumbnail = file.output_thumbnail.name if file.output_thumbnail else None
+    file.output_image.save(name + image.extension, ContentFile(image.content), save=False)
+    file.output_thumbnail = None
+    file.save()
+
+    storage = file.output_image.storage
+    if previous and previous != file.output_image.name:
+        storage.delete(previous)
+        delete_variants(storage, previous)
+    if previous_thumbnail and previous_thumbnail != file.output_thumbnail.name:
+        storage.delete(previous_thumbnail)
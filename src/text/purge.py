@@ -0,0 +1,182 @@
+# purge.py
+"""
+Set-based deletion of chats and background removal of their media.
+
+Deleting a chat used to load every History and File row and delete them one by
+one, removing each file on the way. Now the media names are read with one query
+up front, the rows go in a single cascading delete inside a transaction, and
+once that commits the files are removed on a background thread. If the
+transaction rolls back nothing is removed.
+
+Files that are left behind anyway (a crash between commit and purge, files
+written by a failed request) are found by `python manage.py purge_orphaned_media`.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from speech.audio_cache import tts_cache
+from .image_variants import variant_name
+from .models import Chat, ChatJob, File
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Lazily start the single purge thread.
+
+    Returns:
+    concurrent.futures.ThreadPoolExecutor
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='media-purge')
+        return _executor
+
+
+def file_media_names(output_audio, output_image, output_thumbnail):
+    """
+    Storage names belonging to one File row, including the image variants.
+
+    Returns:
+    tuple: (names to delete, shared TTS cache names to release)
+    """
+    names, shared = [], []
+    if output_audio:
+        (shared if tts_cache.is_cache_name(output_audio) else names).append(output_audio)
+    if output_image:
+        names.append(output_image)
+        names.extend(variant_name(output_image, variant) for variant in settings.IMAGE_VARIANTS)
+    if output_thumbnail and output_thumbnail not in names:
+        names.append(output_thumbnail)
+    return names, shared
+
+
+def collect_media(chats):
+    """
+    Read the media names of a set of chats, one query per table.
+
+    Args:
+    chats (QuerySet): Chats about to be deleted
+
+    Returns:
+    tuple: (names to delete, shared TTS cache names to release)
+    """
+    names, shared = [], []
+    rows = File.objects.filter(history__chat__in=chats).values_list(
+        'output_audio', 'output_image', 'output_thumbnail'
+    )
+    for row in rows:
+        row_names, row_shared = file_media_names(*row)
+        names.extend(row_names)
+        shared.extend(row_shared)
+    names.extend(
+        ChatJob.objects.filter(chat__in=chats).exclude(input_audio='')
+        .exclude(input_audio__isnull=True).values_list('input_audio', flat=True)
+    )
+    return names, shared
+
+
+def purge(names, shared):
+    """
+    Remove media files of deleted rows. Runs after the delete has committed.
+
+    Args:
+    names (list): Storage names to delete
+    shared (list): TTS cache names whose rows are gone
+    """
+    removed = 0
+    for name in names:
+        try:
+            default_storage.delete(name)
+            removed += 1
+        except OSError as e:
+            logger.error(f"Error removing {name}: {str(e)}")
+    for name in set(shared):
+        try:
+            tts_cache.release(name)
+        except Exception as e:
+            logger.error(f"Error releasing {name}: {str(e)}", exc_info=True)
+    logger.info(f"Purged {removed} media files")
+
+
+def delete_chats(chats):
+    """
+    Delete chats with their history, files, errors and jobs, and schedule the
+    removal of their media.
+
+    Args:
+    chats (QuerySet): Chats to delete
+
+    Returns:
+    int: Number of chats deleted
+    """
+    with transaction.atomic():
+        names, shared = collect_media(chats)
+        _, deleted = chats.delete()
+        if names or shared:
+            transaction.on_commit(lambda: get_executor().submit(purge, names, shared))
+    return deleted.get(Chat._meta.label, 0)
+
+
+def referenced_media():
+    """
+    Storage names still referenced by the database.
+
+    Returns:
+    set: Names relative to MEDIA_ROOT
+    """
+    referenced = set()
+    rows = File.objects.values_list('output_audio', 'output_image', 'output_thumbnail').iterator()
+    for row in rows:
+        names, shared = file_media_names(*row)
+        referenced.update(names, shared)
+    referenced.update(
+        ChatJob.objects.exclude(input_audio='').exclude(input_audio__isnull=True)
+        .values_list('input_audio', flat=True).iterator()
+    )
+    return referenced
+
+
+def find_orphans(min_age=0):
+    """
+    Files under MEDIA_ROOT that no row references. In the TTS cache directory
+    only utterances no row uses any more are reported, with all their copies.
+
+    Args:
+    min_age (float): Ignore files modified within this many seconds, they may
+        belong to a request that has not saved its row yet
+
+    Yields:
+    tuple: (storage name, size in bytes)
+    """
+    referenced = referenced_media()
+    cutoff = time.time() - min_age
+    root = settings.MEDIA_ROOT
+    for dirpath, dirnames, filenames in os.walk(root):
+        relative = os.path.relpath(dirpath, root)
+        dirnames[:] = [
+            d for d in dirnames
+            if os.path.normpath(os.path.join(relative, d)).replace(os.sep, '/') != tts_cache.directory
+        ]
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            if name in referenced:
+                continue
+            stat = os.stat(path)
+            if stat.st_mtime > cutoff:
+                continue
+            yield name, stat.st_size
+    yield from tts_cache.unreferenced(min_age)
@@ -1,11 +1,31 @@
 # serializers.py
+from django.urls import reverse
 from rest_framework import serializers
 from .models import Chat, History, File, Errors
+from .image_variants import variant_urls
+
+def wav_url(file, request=None):
+    """
+    URL of the WAV rendition of a row's audio, or None without audio.
+    """
+    if not file.output_audio:
+        return None
+    url = reverse('file-audio-wav', args=[file.pk])
+    return request.build_absolute_uri(url) if request else url
 
 class FileSerializer(serializers.ModelSerializer):
+    output_audio_wav = serializers.SerializerMethodField()
+    output_image_variants = serializers.SerializerMethodField()
+
     class Meta:
         model = File
-        fields = ['id','output_audio', 'output_image', 'added_at', 'updated_at']
+        fields = ['id','output_audio', 'output_audio_wav', 'output_image', 'output_image_variants', 'output_thumbnail', 'added_at', 'updated_at']
+
+    def get_output_audio_wav(self, obj):
+        return wav_url(obj, self.context.get('request'))
+
+    def get_output_image_variants(self, obj):
+        return variant_urls(obj.output_image, self.context.get('request'))
 
 class HistorySerializer(serializers.ModelSerializer):
     files = FileSerializer(many=True, read_only=True)
@@ -32,9 +52,18 @@ class ErrorSerializer(serializers.ModelSerializer):
 # get serializers
 
 class FileSerializers(serializers.ModelSerializer):
+    output_audio_wav = serializers.SerializerMethodField()
+    output_image_variants = serializers.SerializerMethodField()
+
     class Meta:
         model = File
-        fields = ['id','output_audio', 'output_image', 'added_at', 'updated_at']
+        fields = ['id','output_audio', 'output_audio_wav', 'output_image', 'output_image_variants', 'output_thumbnail', 'added_at', 'updated_at']
+
+    def get_output_audio_wav(self, obj):
+        return wav_url(obj, self.context.get('request'))
+
+    def get_output_image_variants(self, obj):
+        return variant_urls(obj.output_image, self.context.get('request'))
 
 class HistorySerializers(serializers.ModelSerializer):
     files = FileSerializers(many=True, read_only=True)
@@ -58,7 +87,7 @@ class ErrorsSerializers(serializers.ModelSerializer):
 
 
 from rest_framework import serializers
-from .models import Chat
+from .models import Chat, ChatJob
 
 class ChatSerializer(serializers.ModelSerializer):
     class Meta:
@@ -69,3 +98,20 @@ class ChatSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         # Automatically generates 'code' in the model's save method
         return super().create(validated_data)
+
+
+class ChatListSerializer(serializers.ModelSerializer):
+    """Chat list entries, without the nested history."""
+    class Meta:
+        model = Chat
+        fields = ['code', 'title', 'added_at', 'updated_at']
+        read_only_fields = fields
+
+
+class ChatJobSerializer(serializers.ModelSerializer):
+    chat_code = serializers.CharField(source='chat_id', read_only=True)
+    history = HistorySerializer(read_only=True)
+
+    class Meta:
+        model = ChatJob
+        fields = ['id', 'chat_code', 'status', 'stage', 'completed_stages', 'error', 'history', 'added_at', 'updated_at']
@@ -1,3 +1,173 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from .context import build_context
+from .models import Chat, History, File
+
+
+class ChatReadQueryTests(TestCase):
+    """
+    The chat read paths run a fixed number of queries, however many chats,
+    history rows and files there are.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(3):
+            chat = Chat.objects.create(title=f"Chat {i}")
+            for j in range(4):
+                history = History.objects.create(chat=chat, input_text=f"in {j}", output_text=f"out {j}")
+                File.objects.create(history=history, output_audio=f"audio/{chat.code}_{j}.ogg")
+                File.objects.create(history=history, output_audio=f"audio/{chat.code}_{j}_b.ogg")
+        cls.chat = chat
+
+    def test_list_chats(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/text/querychat/list_chats/', {'per_page': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertNotIn('interactions', response.json()['results'][0])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(response.json()['next'])
+        self.assertEqual(len(response.json()['results']), 1)
+
+    def test_get_history(self):
+        # chat, history rows, files
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/text/querychat/{self.chat.code}/get_history/')
+        self.assertEqual(response.status_code, 200)
+        interactions = response.json()['interactions']
+        self.assertEqual(len(interactions), 4)
+        self.assertTrue(all(len(interaction['files']) == 2 for interaction in interactions))
+
+    def test_get_chat_history(self):
+        url = reverse('create_or_update_chat')
+        # chat, history page, files
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {'chat_code': self.chat.code, 'per_page': 3})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([item['input_text'] for item in data['history']], ['in 3', 'in 2', 'in 1'])
+        self.assertTrue(all(len(item['files']) == 2 for item in data['history']))
+
+        with self.assertNumQueries(3):
+            response = self.client.get(data['next'])
+        self.assertEqual([item['input_text'] for item in response.json()['history']], ['in 0'])
+
+
+@override_settings(CHAT_CONTEXT_TOKENS=1000, CHAT_SUMMARY_ENABLED=False)
+class BuildContextTests(TestCase):
+    """
+    The rolling summary is only used for turns after the ones it covers.
+    """
+
+    def setUp(self):
+        self.chat = Chat.objects.create()
+        self.turns = [
+            History.objects.create(chat=self.chat, input_text=f"question {i}", output_text=f"answer {i}")
+            for i in range(5)
+        ]
+        Chat.objects.filter(pk=self.chat.pk).update(
+            context_summary="summary of turns 0-3", context_summary_upto=self.turns[3].pk,
+        )
+
+    def test_latest_turn_uses_summary(self):
+        context = build_context(self.turns[4])
+        self.assertIn("summary of turns 0-3", context)
+        self.assertNotIn("question 3", context)
+
+    def test_edited_early_turn_skips_summary(self):
+        context = build_context(self.turns[1])
+        self.assertNotIn("summary", context)
+        self.assertIn("question 0", context)
+        self.assertNotIn("question 2", context)
+
+
+@mock.patch('text.views.decode_audio', return_value='samples')
+class TranscribeViewTests(SimpleTestCase):
+    """
+    transcribe/ returns the text, and the segments with timestamps=true.
+    """
+
+    segments = [{"start": 0.0, "end": 1.5, "text": "hello"}, {"start": 1.5, "end": 3.0, "text": "world"}]
+
+    def post(self, **data):
+        audio = SimpleUploadedFile('clip.ogg', b'audio', content_type='audio/ogg')
+        return self.client.post(reverse('transcribe'), {'audio': audio, **data})
+
+    def test_text_only(self, decode_audio):
+        with mock.patch('text.views.transcribe_samples', return_value='hello world'):
+            response = self.post()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"transcription": "hello world"})
+
+    def test_timestamps(self, decode_audio):
+        result = {"text": "hello world", "segments": self.segments}
+        with mock.patch('text.views.transcribe_segments', return_value=result) as transcribe_segments:
+            response = self.post(timestamps='true')
+        transcribe_segments.assert_called_once_with('samples')
+        self.assertEqual(response.json(), {"transcription": "hello world", "segments": self.segments})
+
+    def test_missing_audio(self, decode_audio):
+        response = self.client.post(reverse('transcribe'))
+        self.assertEqual(response.status_code, 400)
+
+
+class MediaRangeTests(SimpleTestCase):
+    """
+    Byte ranges, If-Range and HEAD on files served from MEDIA_ROOT.
+    """
+
+    data = bytes(range(256)) * 4
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        override = override_settings(MEDIA_ROOT=media_root, MEDIA_SENDFILE_BACKEND=None)
+        override.enable()
+        self.addCleanup(override.disable)
+        os.makedirs(os.path.join(media_root, 'audio'))
+        with open(os.path.join(media_root, 'audio', 'clip.ogg'), 'wb') as f:
+            f.write(self.data)
+        self.url = '/media/audio/clip.ogg'
+
+    def test_suffix_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-100')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 924-1023/1024')
+        self.assertEqual(b''.join(response.streaming_content), self.data[-100:])
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */1024')
+
+    def test_if_range(self):
+        etag = self.client.head(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.data[:10])
+
+        # A changed file is sent whole
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.data)
+
+    def test_head(self):
+        response = self.client.head(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Length'], '1024')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(b''.join(response.streaming_content), b'')
+
+        response = self.client.head(self.url, HTTP_RANGE='bytes=0-9')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(b''.join(response.streaming_content), b'')
@@ -11,10 +11,14 @@ router.register(r'querychat', ChatViewSet)
 router.register(r'error', ErrorViewSet)
 
 urlpatterns = [
-   # path('transcribe/', views.transcribe_view, name='transcribe'),
+    path('transcribe/', views.transcribe_view, name='transcribe'),
     
     path('chat/', views.chat_view, name='create_or_update_chat'),
     path('chat/create/', views.ChatCreateView.as_view(), name='chat-create'),
+    path('chat/stream/', views.chat_stream_view, name='chat-stream'),
+    path('chat/jobs/<uuid:job_id>/', views.chat_job_status, name='chat-job-status'),
+    path('chat/jobs/<uuid:job_id>/events/', views.chat_job_events, name='chat-job-events'),
+    path('files/<int:file_id>/audio.wav', views.file_audio_wav, name='file-audio-wav'),
     
     path('', include(router.urls)),
 ]
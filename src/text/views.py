@@ -5,10 +5,10 @@ import tempfile
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
-import whisper
 import requests
-from pydub import AudioSegment
+import numpy as np
 from urllib.parse import urlparse
+from .audio_decode import decode_audio
 
 def get_audio_file(data):
     """
@@ -62,34 +62,20 @@ def download_audio(url):
     else:
         raise Exception(f"Failed to download audio: HTTP {response.status_code}")
 
-def convert_to_wav(input_file):
+def transcribe_audio(source):
     """
-    Convert the input audio file to WAV format.
+    Transcribe audio using OpenAI's Whisper model.
     
     Args:
-    input_file (str): Path to the input audio file
-    
-    Returns:
-    str: Path to the converted WAV file
-    """
-    audio = AudioSegment.from_file(input_file)
-    wav_file = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-    audio.export(wav_file.name, format="wav")
-    return wav_file.name
-
-def transcribe_audio(file_path):
-    """
-    Transcribe audio file using OpenAI's Whisper model.
-    
-    Args:
-    file_path (str): Path to the audio file
+    source (str, bytes, file-like or numpy.ndarray): Path to the audio file,
+        the encoded audio itself, or already decoded 16 kHz mono samples
     
     Returns:
     str: Transcribed text
     """
-    model = whisper.load_model("base")
-    result = model.transcribe(file_path)
-    return result["text"]
+    if not isinstance(source, np.ndarray):
+        source = decode_audio(source)
+    return transcribe_samples(source)
 
 def cleanup(*file_paths):
     """
@@ -113,36 +99,23 @@ def transcribe_view(request):
     Django view to handle audio transcription requests.
 
     Accepts audio file uploads in different formats (mp3, wav, ogg, etc.).
-    Returns transcribed text as a JSON response.
+    Returns transcribed text as a JSON response. With timestamps=true the
+    response also lists the segments with their start and end times.
     """
     try:
         if 'audio' not in request.FILES:
             return JsonResponse({"error": "No audio file provided"}, status=400)
 
         audio_file = request.FILES['audio']
+        timestamps = str(request.POST.get('timestamps', 'false')).lower() == 'true'
 
         file_extension = os.path.splitext(audio_file.name)[1].lower()
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
-            for chunk in audio_file.chunks():
-                temp_file.write(chunk)
-        
-        input_file_path = temp_file.name
-
-        if file_extension != ".wav":
-            audio = AudioSegment.from_file(input_file_path)
-            wav_file_path = tempfile.mktemp(suffix='.wav')
-            audio.export(wav_file_path, format="wav")
-        else:
-            wav_file_path = input_file_path
-
-        model = whisper.load_model("base")
-        result = model.transcribe(wav_file_path)
-        transcription = result["text"]
-        
-        os.remove(input_file_path)
-        if file_extension != ".wav":
-            os.remove(wav_file_path)
+        audio = decode_audio(audio_file, suffix=file_extension)
+        if timestamps:
+            result = transcribe_segments(audio)
+            return JsonResponse({"transcription": result["text"], "segments": result["segments"]})
+        transcription = transcribe_audio(audio)
 
         return JsonResponse({"transcription": transcription})
 
@@ -171,19 +144,31 @@ class ChatCreateView(APIView):
 from rest_framework import status, views
 from rest_framework.decorators import api_view, parser_classes
 from rest_framework.response import Response
-from .models import Chat, History, File, Errors
-from .serializers import ChatSerializer, HistorySerializer, FileSerializer, ErrorSerializer
+from .models import Chat, History, File, Errors, ChatJob
+from .serializers import ChatSerializer, ChatListSerializer, HistorySerializer, FileSerializer, ErrorSerializer, ChatJobSerializer
+from .pagination import ChatCursorPagination, HistoryCursorPagination
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 from django.db import transaction
+from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
 from django.core.files.base import ContentFile
-from speech.views import text_to_speech
-from image_gen.views import generate_summary, generate_image, generate_text
+from speech.services import text_to_speech
+from speech.audio_codec import decode_to_wav, is_wav
+from .purge import delete_chats
+from .context import build_context
+from .pipeline import transcribe_samples, transcribe_segments, handle_audio_input, generate_text_stage, stream_text_stage, run_media_branches, save_audio, save_image
+from . import jobs
+from image_gen.services import ServiceError, generate_summary, generate_image, generate_text
 import uuid
-from django.core.paginator import Paginator
+import asyncio
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404
 import json
-from django.http import JsonResponse, FileResponse
+from django.http import HttpResponse, JsonResponse, FileResponse, StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.urls import reverse
 from django.core.files import File as DjangoFile
 import base64
 from PIL import Image
@@ -191,8 +176,6 @@ from io import BytesIO
 import os
 from django.core.exceptions import ObjectDoesNotExist
 import tempfile
-from pydub import AudioSegment
-import whisper
 import logging
 import time
 import os
@@ -230,6 +213,7 @@ def create_chat(request):
     input_type = data.get('input_type', 'text')
     input_content = data.get('input_content', '')
     generate_image_flag = str(data.get('generate_image', 'false')).lower() == 'true'
+    run_async = str(data.get('async', 'false')).lower() == 'true'
 
     try:
         # Create new chat or get existing one
@@ -241,104 +225,34 @@ def create_chat(request):
             chat = Chat.objects.get(code=chat_code)
             logger.info(f"Retrieved existing chat with code: {chat.code}")
 
+        audio_file = request.FILES.get('audio') if input_type == 'audio' else None
+        if input_type == 'audio' and not audio_file:
+            logger.error("No audio file provided")
+            return Response({"error": "No audio file provided"}, status=400)
+
+        if run_async:
+            return create_chat_job(chat, input_content, audio_file, generate_image_flag)
+
         # Handle audio input if provided
-        if input_type == 'audio':
-            audio_file = request.FILES.get('audio')
-            if audio_file:
-                input_content = handle_audio_input(audio_file)
-                if not input_content:
-                    logger.error("Failed to transcribe audio")
-                    return Response({"error": "Failed to transcribe audio"}, status=400)
-            else:
-                logger.error("No audio file provided")
-                return Response({"error": "No audio file provided"}, status=400)
+        if audio_file:
+            input_content = handle_audio_input(audio_file)
+            if not input_content:
+                logger.error("Failed to transcribe audio")
+                return Response({"error": "Failed to transcribe audio"}, status=400)
 
         # Create chat history
         history = History.objects.create(chat=chat, input_text=input_content)
         logger.info(f"Created chat history with ID: {history.id}")
 
         # Generate text response
-        logger.info("Generating text response...")
-        output_text_response = generate_text({"text": input_content})
-        if isinstance(output_text_response, JsonResponse):
-            output_text_data = json.loads(output_text_response.content.decode('utf-8'))
-            output_text = output_text_data.get('generated_text', '')
-            logger.info(f"Generated text response: {output_text[:50]}...")  # Log first 50 chars
-        else:
-            logger.error("Invalid response from generate_text")
+        output_text = generate_text_stage(history)
+        if output_text is None:
             return Response({"error": "Invalid response from generate_text"}, status=500)
-        # saving the title
-        chat = Chat.objects.get(code=chat_code)
-        def get_first_four_words(sentence):
-            words = sentence.split()  
-            first_four_words = words[:4] 
-            return ' '.join(first_four_words) 
-        
-        if chat.title == 'New chat':
-            chat.title = get_first_four_words(output_text)
-            chat.save()
-            logger.info(f"Set chat title: {chat.title}")
 
-        
-        history.output_text = output_text
-        history.save()
-
-        # Generate image if needed
-        if len(output_text) > 200 and generate_image_flag:
-            logger.info("Generating image...")
-            summary_response = generate_summary({"text": output_text})
-            if isinstance(summary_response, JsonResponse):
-                summary_data = json.loads(summary_response.content.decode('utf-8'))
-                summary = summary_data.get('summary_text', '')
-                if summary:
-                    image_response = generate_image({"text": summary})
-                    if isinstance(image_response, JsonResponse):
-                        image_data = json.loads(image_response.content.decode('utf-8'))
-                        image_base64 = image_data.get('image_base64', '')
-                        if image_base64:
-                            image_content = base64.b64decode(image_base64)
-                            file = File.objects.create(history=history)
-                            file.output_image.save('generated_image.jpg', ContentFile(image_content), save=True)
-                            logger.info("Image generated and saved successfully")
-                        else:
-                            logger.warning("No image data from generate_image")
-                    else:
-                        logger.warning("Invalid response from generate_image")
-                else:
-                    logger.warning("No summary generated for image")
-            else:
-                logger.warning("Invalid response from generate_summary")
-
-        # Generate audio response
-        logger.info("Generating audio response...")
-        audio_response = text_to_speech(output_text)
-
-        if isinstance(audio_response, Response):
-            audio_data = audio_response.data
-            if "error" in audio_data:
-                logger.warning(f"Invalid response from text_to_speech: {audio_data['error']}")
-            else:
-                audio_base64 = audio_data.get('audio_base64', '')
-                if audio_base64:
-                    try:
-                        audio_content = base64.b64decode(audio_base64)
-                        file = File.objects.create(history=history)
-                        file_name = f'generated_audio_{int(time.time())}.wav'  # Unique filename
-                        file.output_audio.save(file_name, ContentFile(audio_content), save=True)
-                        logger.info(f"Audio generated and saved successfully: {file_name}")
-                    except Exception as e:
-                        logger.error(f"Error saving audio file: {str(e)}")
-                else:
-                    logger.warning("No audio data from text_to_speech")
-        else:
-            logger.error("Unexpected response type from text_to_speech")
-
-
-        if not chat.title:
-            chat.title = ' '.join(output_text.split()[:3])
-            chat.save()
-            logger.info(f"Set chat title: {chat.title}")
+        # Generate the image (if needed) and the audio response concurrently
+        run_media_branches(history, output_text, len(output_text) > 200 and generate_image_flag)
 
+        chat.refresh_from_db()
         logger.info("Chat creation completed successfully")
         return Response(ChatSerializer(chat).data, status=status.HTTP_201_CREATED)
 
@@ -350,27 +264,174 @@ def create_chat(request):
         if 'chat' in locals():
             Errors.objects.create(chat=chat, error=str(e))
         return Response({"error": str(e)}, status=500)
+
+
+def create_chat_job(chat, input_content, audio_file, generate_image_flag):
+    """
+    Queue a chat turn for background processing.
+
+    Returns:
+    Response: 202 with the job id and the URLs to poll or subscribe to
+    """
+    with transaction.atomic():
+        job = ChatJob.objects.create(chat=chat, input_text=input_content, generate_image=generate_image_flag)
+        if audio_file:
+            job.input_audio.save(audio_file.name, audio_file, save=True)
+        jobs.enqueue(job)
+    logger.info(f"Queued chat job {job.pk} for chat {chat.code}")
+    return Response({
+        "job_id": str(job.pk),
+        "chat_code": chat.code,
+        "status": job.status,
+        "status_url": reverse('chat-job-status', args=[job.pk]),
+        "events_url": reverse('chat-job-events', args=[job.pk]),
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+def chat_job_status(request, job_id):
+    """
+    Current state of a background chat turn, including the history row once it exists.
+    """
+    job = get_object_or_404(ChatJob.objects.select_related('history'), pk=job_id)
+    return Response(ChatJobSerializer(job).data)
+
+
+def job_event(job_id):
+    """
+    Returns:
+    tuple: (SSE event of the job's current state, whether the job has ended)
+    """
+    job = ChatJob.objects.select_related('history').get(pk=job_id)
+    return sse_event(job.status, ChatJobSerializer(job).data), job.status in (ChatJob.DONE, ChatJob.FAILED)
+
+
+async def chat_job_events(request, job_id):
+    """
+    Server-sent events stream of a job's state, one event per change, closed
+    when the job is done or failed.
+
+    The stream waits with asyncio.sleep, so under ASGI it holds no worker
+    thread. Under WSGI it ends after CHAT_JOB_EVENTS_WSGI_TIMEOUT seconds with
+    a retry hint and EventSource reconnects.
+    """
+    if not await ChatJob.objects.filter(pk=job_id).aexists():
+        raise Http404("Job not found")
+    timeout = settings.CHAT_JOB_EVENTS_TIMEOUT if isinstance(request, ASGIRequest) else settings.CHAT_JOB_EVENTS_WSGI_TIMEOUT
+
+    async def events():
+        last = None
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            event, ended = await sync_to_async(job_event)(job_id)
+            if event != last:
+                last = event
+                yield event
+            if ended:
+                return
+            await asyncio.sleep(settings.CHAT_JOB_EVENTS_POLL_INTERVAL)
+        yield f"retry: {int(settings.CHAT_JOB_EVENTS_POLL_INTERVAL * 1000)}\n\n"
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def sse_event(event, data):
+    """
+    Format one server-sent event.
+    """
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+@api_view(['POST'])
+@parser_classes([JSONParser, MultiPartParser, FormParser])
+def chat_stream_view(request):
+    """
+    Create a chat turn and stream the answer as server-sent events.
     
+    Takes the same fields as a POST to chat/ except async; new_chat=true starts
+    a new chat. Events:
+    chat: {"chat_code": ...} first, so a new chat can be continued
+    token: {"text": ...} for each cleaned piece of the answer as it is generated
+    done: the history row, once the full answer is saved to History.output_text
+    media: the history row again, after the image (if requested) and audio are saved
+    error: {"error": ...} if generation fails part way
+    """
+    data = request.data
+    new_chat = str(data.get('new_chat', 'false')).lower() == 'true'
+    input_type = data.get('input_type', 'text')
+    input_content = data.get('input_content', '')
+    generate_image_flag = str(data.get('generate_image', 'false')).lower() == 'true'
+
+    chat = None
+    if not new_chat:
+        try:
+            chat = Chat.objects.get(code=data.get('chat_code'))
+        except Chat.DoesNotExist:
+            return Response({"error": "Chat not found"}, status=404)
+
+    if input_type == 'audio':
+        audio_file = request.FILES.get('audio')
+        if not audio_file:
+            return Response({"error": "No audio file provided"}, status=400)
+        input_content = handle_audio_input(audio_file)
+        if not input_content:
+            return Response({"error": "Failed to transcribe audio"}, status=400)
+
+    if chat is None:
+        chat = Chat.objects.create()
+        logger.info(f"Created new chat with code: {chat.code}")
+    history = History.objects.create(chat=chat, input_text=input_content)
+
+    def events():
+        yield sse_event('chat', {"chat_code": chat.code})
+        try:
+            for piece in stream_text_stage(history):
+                yield sse_event('token', {"text": piece})
+            yield sse_event('done', HistorySerializer(history).data)
+
+            run_media_branches(history, history.output_text, len(history.output_text) > 200 and generate_image_flag)
+            yield sse_event('media', HistorySerializer(history).data)
+        except Exception as e:
+            logger.error(f"Error in chat_stream_view: {str(e)}", exc_info=True)
+            Errors.objects.create(chat=chat, error=str(e))
+            yield sse_event('error', {"error": str(e)})
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the stream
+    return response
+
+
+def history_with_files():
+    """
+    History rows with their files fetched in one extra query, not one per row.
+    """
+    return History.objects.prefetch_related(Prefetch('files', queryset=File.objects.order_by('id')))
+
 
 def get_chat_history(request):
+    """
+    One page of a chat's history, newest first.
+
+    Pages are cursor based: follow the "next" URL of the response to load
+    older rows. per_page sets the page size.
+    """
     try:
         chat_code = request.query_params.get('chat_code')
-        page = int(request.query_params.get('page', 1))
-        per_page = int(request.query_params.get('per_page', 10))
 
         chat = Chat.objects.get(code=chat_code)
-        history = History.objects.filter(chat=chat).order_by('-added_at')
-
-        paginator = Paginator(history, per_page)
-        paginated_history = paginator.page(page)
+        history = history_with_files().filter(chat=chat)
 
-        serialized_history = HistorySerializer(paginated_history, many=True).data
+        paginator = HistoryCursorPagination()
+        page = paginator.paginate_queryset(history, request)
 
         return Response({
-            "chat": ChatSerializer(chat).data,
-            "history": serialized_history,
-            "total_pages": paginator.num_pages,
-            "current_page": page
+            "chat": ChatListSerializer(chat).data,
+            "history": HistorySerializer(page, many=True).data,
+            "next": paginator.get_next_link(),
+            "previous": paginator.get_previous_link(),
         }, status=status.HTTP_200_OK)
     except Chat.DoesNotExist:
         return Response({"error": "Chat not found"}, status=404)
@@ -378,6 +439,26 @@ def get_chat_history(request):
         logger.error(f"Error in get_chat_history: {str(e)}", exc_info=True)
         return Response({"error": str(e)}, status=500)
 
+@require_http_methods(["GET"])
+def file_audio_wav(request, file_id):
+    """
+    The audio of a File row as WAV, for clients that cannot play the storage codec.
+    """
+    file = get_object_or_404(File, pk=file_id)
+    if not file.output_audio:
+        return JsonResponse({"error": "No audio for this file"}, status=404)
+    with file.output_audio.open('rb') as stored:
+        data = stored.read()
+    if not is_wav(file.output_audio.name):
+        try:
+            data = decode_to_wav(data)
+        except RuntimeError as e:
+            logger.error(f"Error decoding {file.output_audio.name}: {str(e)}")
+            return JsonResponse({"error": "Failed to decode audio"}, status=500)
+    response = HttpResponse(data, content_type='audio/wav')
+    response['Content-Disposition'] = f'inline; filename="audio_{file.pk}.wav"'
+    return response
+
 def update_chat(request):
     try:
         data = request.data
@@ -385,43 +466,37 @@ def update_chat(request):
         new_input = data.get('new_input')
 
         history = History.objects.get(id=history_id)
+        if new_input == history.input_text and history.output_text:
+            # Nothing changed, keep the existing answer, image and audio
+            return Response(HistorySerializer(history).data, status=status.HTTP_200_OK)
         history.input_text = new_input
         history.save()
 
-        output_text_response = generate_text({"text": new_input})
-        if isinstance(output_text_response, JsonResponse):
-            output_text_data = json.loads(output_text_response.content.decode('utf-8'))
-            output_text = output_text_data.get('generated_text', '')
-        else:
+        try:
+            output_text = generate_text(new_input, build_context(history))
+        except ServiceError:
             return Response({"error": "Invalid response from generate_text"}, status=500)
 
         history.output_text = output_text
         history.save()
 
-        if File.objects.filter(history=history, output_image__isnull=False).exists():
-            summary_response = generate_summary({"text": output_text})
-            if isinstance(summary_response, JsonResponse):
-                summary_data = json.loads(summary_response.content.decode('utf-8'))
-                summary = summary_data.get('summary_text', '')
+        image_file = File.objects.filter(history=history, output_image__isnull=False).exclude(output_image='').first()
+        if image_file is not None:
+            try:
+                summary = generate_summary(output_text)
                 if summary:
-                    image_response = generate_image({"text": summary})
-                    if isinstance(image_response, JsonResponse):
-                        image_data = json.loads(image_response.content.decode('utf-8'))
-                        image_base64 = image_data.get('image_base64', '')
-                        if image_base64:
-                            image_content = base64.b64decode(image_base64)
-                            file = File.objects.get(history=history, output_image__isnull=False)
-                            file.output_image.save('updated_image.jpg', ContentFile(image_content), save=True)
-                    else:
-                        logger.warning("Invalid response from generate_image")
-            else:
-                logger.warning("Invalid response from generate_summary")
-
-        audio_response = text_to_speech(output_text)
-        
-        if isinstance(audio_response, FileResponse):
-            file, created = File.objects.get_or_create(history=history, defaults={'output_audio': None})
-            file.output_audio.save('updated_audio.wav', audio_response.getvalue(), save=True)
+                    image = generate_image(summary)
+                    if image.content:
+                        save_image(image_file, image, 'updated_image')
+            except Exception as e:
+                logger.warning(f"Could not regenerate image: {str(e)}")
+
+        speech = text_to_speech(output_text)
+        if speech.content:
+            file = File.objects.filter(history=history, output_audio__isnull=False).exclude(output_audio='').first()
+            if file is None:
+                file = File.objects.create(history=history)
+            save_audio(file, speech, 'updated_audio.wav')
         else:
             logger.warning("Invalid response from text_to_speech")
 
@@ -435,82 +510,46 @@ def update_chat(request):
 def delete_chat(request):
     try:
         chat_code = request.query_params.get('chat_code')
-        chat = Chat.objects.get(code=chat_code)
-        
-        # Get all associated histories
-        histories = History.objects.filter(chat=chat)
-        
-        for history in histories:
-            # Get all associated files
-            files = File.objects.filter(history=history)
-            
-            for file in files:
-                # Delete the file from local storage
-                if file.output_audio:
-                    if os.path.isfile(file.output_audio.path):
-                        os.remove(file.output_audio.path)
-                if file.output_image:
-                    if os.path.isfile(file.output_image.path):
-                        os.remove(file.output_image.path)
-                
-                # Delete the file record
-                file.delete()
-            
-            # Delete the history record
-            history.delete()
-        
-        # Delete the chat
-        chat.delete()
+        # Rows go in one transaction, media is removed in the background after it commits
+        if not delete_chats(Chat.objects.filter(code=chat_code)):
+            return Response({"error": "Chat not found"}, status=status.HTTP_404_NOT_FOUND)
         
         return Response({"message": "Chat and associated files deleted successfully"}, status=status.HTTP_200_OK)
-    except Chat.DoesNotExist:
-        return Response({"error": "Chat not found"}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         logger.error(f"Error in delete_chat: {str(e)}", exc_info=True)
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
-def handle_audio_input(audio_file):
-    try:
-        file_extension = os.path.splitext(audio_file.name)[1].lower()
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
-            for chunk in audio_file.chunks():
-                temp_file.write(chunk)
-
-        input_file_path = temp_file.name
-
-        if file_extension != ".wav":
-            audio = AudioSegment.from_file(input_file_path)
-            wav_file_path = tempfile.mktemp(suffix='.wav')
-            audio.export(wav_file_path, format="wav")
-        else:
-            wav_file_path = input_file_path
-
-        model = whisper.load_model("base")
-        result = model.transcribe(wav_file_path)
-        os.remove(wav_file_path)
-        return result.get('text', '')
-
-    except Exception as e:
-        logger.error(f"Error in handle_audio_input: {str(e)}", exc_info=True)
-        return None
-
-
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import Chat, History, File, Errors
-from .serializers import ChatSerializer, HistorySerializer, FileSerializer, ErrorSerializer
+from .serializers import ChatSerializer, ChatSerializers, ChatListSerializer, HistorySerializer, FileSerializer, ErrorSerializer
 from django.shortcuts import get_object_or_404
 
 class ChatViewSet(viewsets.ModelViewSet):
     queryset = Chat.objects.all().order_by('-updated_at')
     serializer_class = ChatSerializer
+    pagination_class = ChatCursorPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'get_history':
+            interactions = history_with_files().order_by('added_at')
+            queryset = queryset.prefetch_related(Prefetch('interactions', queryset=interactions))
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action in ('list', 'list_chats'):
+            return ChatListSerializer
+        if self.action == 'get_history':
+            return ChatSerializers
+        return super().get_serializer_class()
 
     @action(detail=False, methods=['GET'])
     def list_chats(self, request):
-        chats = self.get_queryset()
-        serializer = self.get_serializer(chats, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=['POST'])
     def create_interaction(self, request, pk=None):
@@ -552,7 +591,7 @@ class ChatViewSet(viewsets.ModelViewSet):
 
     def destroy(self, request, *args, **kwargs):
         chat = self.get_object()
-        chat.delete()
+        delete_chats(Chat.objects.filter(pk=chat.pk))
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 class ErrorViewSet(viewsets.ModelViewSet):
@@ -0,0 +1,281 @@
+# whisper_models.py
+"""
+Process-wide registry of loaded Whisper models.
+
+Loading a Whisper checkpoint means reading the weights from disk and
+deserialising them into torch tensors, which takes seconds. The registry keeps
+every (model size, device, dtype) variant loaded once per worker process so a
+request only pays for inference.
+
+A loaded model must not run two inferences at once: Whisper's decoder keeps its
+kv-cache in forward hooks on the shared modules. Use use_whisper_model(), which
+holds the model's inference lock, around every transcribe/decode call.
+"""
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+import whisper
+from django.conf import settings
+
+from src.quantization import model_size_bytes, quantize_int8
+
+logger = logging.getLogger(__name__)
+
+
+def quantize_whisper_int8(model):
+    """
+    Dynamic int8 quantisation of a CPU Whisper model.
+
+    Whisper's Linear subclass only adds a dtype cast, so its layers are turned
+    back into plain nn.Linear first for torch to recognise them. Other Linear
+    subclasses are left alone.
+
+    Args:
+    model (whisper.model.Whisper): fp32 model on the CPU
+
+    Returns:
+    whisper.model.Whisper: The quantised model
+    """
+    import torch
+
+    for module in model.modules():
+        if type(module) is whisper.model.Linear:
+            module.__class__ = torch.nn.Linear
+    return quantize_int8(model)
+
+
+class WhisperModelRegistry:
+    """
+    Thread-safe cache of Whisper models keyed by (name, device, dtype).
+
+    Models are loaded on first use (or on warm-up) and kept until they are
+    evicted, either because they have been idle longer than ``idle_timeout``
+    seconds or because keeping them would exceed ``memory_budget`` bytes.
+    A budget or timeout of 0 disables that kind of eviction.
+    """
+
+    def __init__(self, memory_budget=0, idle_timeout=0):
+        self.memory_budget = memory_budget
+        self.idle_timeout = idle_timeout
+        self._entries = OrderedDict()  # key -> {"model", "size", "last_used"}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._inference_locks = weakref.WeakKeyDictionary()  # model -> Lock
+        self._reaper = None
+
+    def make_key(self, name=None, device=None, dtype=None):
+        """
+        Fill in the configured defaults for a model key.
+
+        Returns:
+        tuple: (name, device, dtype)
+        """
+        name = name or settings.WHISPER_MODEL
+        device = device or settings.WHISPER_DEVICE
+        if device is None:
+            import torch
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+        dtype = dtype or settings.WHISPER_DTYPE
+        if dtype == "int8" and device != "cpu":
+            # Dynamically quantised layers only run on the CPU.
+            device = "cpu"
+        return (name, device, dtype)
+
+    def get(self, name=None, device=None, dtype=None):
+        """
+        Return a loaded model, loading it on first use.
+
+        Args:
+        name (str): Whisper model size, e.g. "base"
+        device (str): torch device, e.g. "cpu" or "cuda"
+        dtype (str): "float32", "float16" or "int8"
+
+        Returns:
+        whisper.model.Whisper: The loaded model
+        """
+        key = self.make_key(name, device, dtype)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry["last_used"] = time.monotonic()
+                self._entries.move_to_end(key)
+                return entry["model"]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Only callers asking for the same key wait on each other while it loads.
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry["last_used"] = time.monotonic()
+                    self._entries.move_to_end(key)
+                    return entry["model"]
+
+            model = self._load(*key)
+            size = model_size_bytes(model)
+
+            with self._lock:
+                self._entries[key] = {"model": model, "size": size, "last_used": time.monotonic()}
+                self._evict(keep=key)
+                self._start_reaper()
+            return model
+
+    def inference_lock(self, model):
+        """
+        The lock serialising inference on one loaded model.
+
+        Returns:
+        threading.Lock
+        """
+        with self._lock:
+            lock = self._inference_locks.get(model)
+            if lock is None:
+                lock = self._inference_locks[model] = threading.Lock()
+            return lock
+
+    @contextmanager
+    def use(self, name=None, device=None, dtype=None):
+        """
+        Get a model and hold its inference lock while the block runs.
+
+            with registry.use() as model:
+                result = model.transcribe(audio)
+        """
+        model = self.get(name, device, dtype)
+        key = self.make_key(name, device, dtype)
+        with self.inference_lock(model):
+            try:
+                yield model
+            finally:
+                # Also after a failed inference, so the reaper does not see the model as idle
+                with self._lock:
+                    if key in self._entries:
+                        self._entries[key]["last_used"] = time.monotonic()
+
+    def _load(self, name, device, dtype):
+        started = time.monotonic()
+        model = whisper.load_model(name, device=device)
+        if dtype == "float16":
+            model = model.half()
+        elif dtype == "int8":
+            model = quantize_whisper_int8(model)
+        logger.info(f"Loaded Whisper model {name} on {device} ({dtype}) in {time.monotonic() - started:.2f}s")
+        return model
+
+    def _evict(self, keep=None):
+        # Caller must hold self._lock.
+        now = time.monotonic()
+        if self.idle_timeout:
+            for key in list(self._entries):
+                entry = self._entries[key]
+                lock = self._inference_locks.get(entry["model"])
+                in_use = lock is not None and lock.locked()
+                if key != keep and not in_use and now - entry["last_used"] > self.idle_timeout:
+                    self._drop(key, "idle")
+        if self.memory_budget:
+            for key in list(self._entries):
+                if self.memory_usage() <= self.memory_budget:
+                    break
+                if key != keep:
+                    self._drop(key, "memory budget")
+
+    def _drop(self, key, reason):
+        self._entries.pop(key)
+        self._load_locks.pop(key, None)
+        logger.info(f"Evicted Whisper model {key} ({reason})")
+
+    def evict_idle(self):
+        """Evict models that have been idle longer than the idle timeout."""
+        with self._lock:
+            self._evict()
+
+    def _start_reaper(self):
+        # Caller must hold self._lock. A daemon thread unloads idle models, including the only one.
+        if not self.idle_timeout or self._reaper is not None:
+            return
+        self._reaper = threading.Thread(target=self._reap, name='whisper-reaper', daemon=True)
+        self._reaper.start()
+
+    def _reap(self):
+        interval = max(1.0, min(self.idle_timeout / 2, 60.0))
+        while True:
+            time.sleep(interval)
+            self.evict_idle()
+
+    def memory_usage(self):
+        """
+        Returns:
+        int: Bytes held by all loaded models
+        """
+        return sum(entry["size"] for entry in self._entries.values())
+
+    def loaded(self):
+        """
+        Returns:
+        list: Keys of the models currently loaded
+        """
+        with self._lock:
+            return list(self._entries)
+
+    def warm_up(self, names=None):
+        """
+        Load models ahead of the first request and run a short silent clip
+        through each one so lazy torch initialisation happens up front.
+
+        Args:
+        names (list): Model sizes to load, defaults to WHISPER_WARMUP_MODELS
+        """
+        for name in names or settings.WHISPER_WARMUP_MODELS:
+            key = self.make_key(name)
+            with self.use(*key) as model:
+                model.transcribe(np.zeros(whisper.audio.SAMPLE_RATE, dtype=np.float32), fp16=key[2] == "float16")
+
+    def clear(self):
+        """Drop every loaded model."""
+        with self._lock:
+            self._entries.clear()
+            self._load_locks.clear()
+
+
+registry = WhisperModelRegistry(
+    memory_budget=settings.WHISPER_MEMORY_BUDGET_MB * 1024 * 1024,
+    idle_timeout=settings.WHISPER_IDLE_TIMEOUT,
+)
+
+
+def get_whisper_model(name=None, device=None, dtype=None):
+    """
+    Get a shared Whisper model from the process-wide registry.
+
+    Returns:
+    whisper.model.Whisper: The loaded model
+    """
+    return registry.get(name, device, dtype)
+
+
+def use_whisper_model(name=None, device=None, dtype=None):
+    """
+    Get a shared Whisper model and hold its inference lock:
+
+        with use_whisper_model() as model:
+            result = model.transcribe(audio, **transcribe_options())
+
+    Returns:
+    contextmanager: Yields whisper.model.Whisper
+    """
+    return registry.use(name, device, dtype)
+
+
+def transcribe_options(dtype=None):
+    """
+    Keyword arguments for model.transcribe matching the configured dtype.
+
+    Returns:
+    dict: Options passed to model.transcribe
+    """
+    return {"fp16": (dtype or settings.WHISPER_DTYPE) == "float16"}